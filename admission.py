@@ -0,0 +1,162 @@
+# admission.py - Admission control dan load shedding untuk endpoint berat
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, request
+
+# Jumlah reverse proxy tepercaya di depan app (Render: 1); 0 = abaikan
+# X-Forwarded-For dan pakai alamat koneksi langsung
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 1))
+
+
+class TokenBucket:
+    """Rate limiter token bucket per client"""
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, client):
+        """Ambil satu token; return (diizinkan, detik sampai token berikutnya)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[client] = (tokens, now)
+
+            # Buang client paling lama tidak aktif supaya memori tetap terbatas
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+
+        if allowed:
+            return True, 0
+        wait = (1 - tokens) / self.rate if self.rate > 0 else 60
+        return False, wait
+
+
+class ConcurrencyLimiter:
+    """Batasi request yang berjalan bersamaan dengan antrean tunggu terbatas"""
+
+    def __init__(self, max_concurrent, max_queue, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+
+    def acquire(self):
+        """Return (alasan penolakan atau None, apakah sempat masuk antrean)"""
+        with self._cond:
+            if self.active < self.max_concurrent and self.waiting == 0:
+                self.active += 1
+                return None, False
+            if self.waiting >= self.max_queue:
+                return 'queue_full', False
+
+            self.waiting += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return 'queue_timeout', True
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            return None, True
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+class AdmissionPolicy:
+    """Kombinasi rate limit per client dan batas konkurensi untuk satu endpoint"""
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout,
+                 rate, burst, retry_after=1):
+        self.name = name
+        self.limiter = ConcurrencyLimiter(max_concurrent, max_queue, queue_timeout)
+        self.bucket = TokenBucket(rate, burst)
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._stats = {
+            'admitted': 0,
+            'queued': 0,
+            'shed_rate_limited': 0,
+            'shed_queue_full': 0,
+            'shed_queue_timeout': 0,
+        }
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['active'] = self.limiter.active
+        stats['waiting'] = self.limiter.waiting
+        stats['max_concurrent'] = self.limiter.max_concurrent
+        stats['max_queue'] = self.limiter.max_queue
+        return stats
+
+    def __call__(self, view):
+        """Decorator Flask: tolak cepat dengan 429/503 saat kelebihan beban"""
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            allowed, wait = self.bucket.take(client_id())
+            if not allowed:
+                self._count('shed_rate_limited')
+                return _reject(429, 'Terlalu banyak permintaan, silakan coba lagi nanti', wait)
+
+            reason, queued = self.limiter.acquire()
+            if queued:
+                self._count('queued')
+            if reason is not None:
+                self._count(f'shed_{reason}')
+                return _reject(503, 'Server sedang sibuk, silakan coba lagi nanti', self.retry_after)
+
+            self._count('admitted')
+            try:
+                return view(*args, **kwargs)
+            finally:
+                self.limiter.release()
+
+        return wrapper
+
+
+def client_id():
+    """Identitas client untuk rate limit.
+
+    Entry kiri X-Forwarded-For diisi client sendiri dan bisa dipalsukan,
+    jadi yang dipakai adalah entry ke-TRUSTED_PROXIES dari kanan (ditambahkan
+    proxy tepercaya, mis. load balancer Render). Tanpa header atau jika
+    entry-nya kurang, dipakai remote_addr.
+    """
+    if TRUSTED_PROXIES > 0:
+        hops = [hop.strip() for hop in request.headers.get('X-Forwarded-For', '').split(',') if hop.strip()]
+        if len(hops) >= TRUSTED_PROXIES:
+            return hops[-TRUSTED_PROXIES]
+    return request.remote_addr or 'unknown'
+
+
+def _reject(status, message, retry_after):
+    response = jsonify({'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
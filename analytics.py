@@ -0,0 +1,314 @@
+# analytics.py - Agregasi ad-hoc di atas kolom NumPy (categorical encoding)
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+# Kolom kategorikal yang bisa dipakai untuk group_by; kolom period juga
+# selalu tersedia sebagai dimensi untuk query lintas periode
+DIMENSIONS = (
+    'fraksi', 'partai', 'dapil', 'agama', 'kota_lahir', 'usia_kategori',
+    'pendidikan_terakhir', 'is_kader', 'is_dewan',
+)
+
+# Dimensi turunan: kelompok usia dengan lebar bin age_bin (default 10 tahun)
+AGE_BIN_DIMENSION = 'usia_bin'
+
+METRICS = ('count', 'share', 'mean_age', 'median_age', 'kader_ratio', 'dewan_ratio')
+
+# Nilai flag yang dianggap "ya" per kolom (data sumber tidak seragam dan
+# sebagian kolom bergeser, jadi 'dewan' di is_kader bukan berarti kader)
+KADER_TRUE_VALUES = {'1', '1.0', 'true', 'ya', 'kader'}
+DEWAN_TRUE_VALUES = {'1', '1.0', 'true', 'ya', 'dewan'}
+
+MISSING_LABEL = 'Tidak tersedia'
+
+# Batas jumlah kombinasi grup (ukuran array bincount)
+MAX_GROUPS = 2_000_000
+
+# Jumlah lebar age_bin berbeda yang kodenya disimpan per store (LRU)
+MAX_AGE_BINS = 16
+
+
+class ColumnStore:
+    """Snapshot kolom anggota_dpr sebagai array NumPy.
+
+    Kolom teks disimpan sebagai kode integer (np.unique dengan
+    return_inverse) plus array label, usia sebagai float dengan NaN untuk
+    data kosong, dan flag sebagai array boolean.
+    """
+
+    def __init__(self, columns):
+        self.size = len(columns['age'])
+        self.codes = {}
+        self.labels = {}
+        for name, values in columns.items():
+            if name in ('age', 'kader', 'dewan'):
+                continue
+            values = np.asarray([v if v else MISSING_LABEL for v in values], dtype=object)
+            labels, codes = np.unique(values.astype(str), return_inverse=True)
+            self.labels[name] = labels
+            self.codes[name] = codes.astype(np.int32)
+
+        self.age = np.asarray(columns['age'], dtype=np.float64)
+        self.age_valid = ~np.isnan(self.age)
+        # Usia hampir selalu bilangan bulat < 128, jadi median bisa dihitung
+        # dari histogram per grup tanpa sorting
+        valid_ages = self.age[self.age_valid]
+        self.integer_ages = bool(
+            np.all(valid_ages == np.floor(valid_ages)) and np.all((valid_ages >= 0) & (valid_ages < 128))
+        )
+        self._age_bins = OrderedDict()
+        self._age_bins_lock = threading.Lock()
+        self.kader = np.asarray(columns['kader'], dtype=bool)
+        self.dewan = np.asarray(columns['dewan'], dtype=bool)
+
+    @classmethod
+    def from_records(cls, records):
+        """Bangun store dari iterable dict/row anggota_dpr"""
+        year = datetime.now().year
+        columns = {name: [] for name in DIMENSIONS + ('period',)}
+        columns.update(age=[], kader=[], dewan=[])
+
+        for record in records:
+            record = dict(record)
+            for name in DIMENSIONS + ('period',):
+                columns[name].append(str(record.get(name) or '').strip())
+            columns['age'].append(parse_age(record.get('usia'), record.get('ttl'), year))
+            columns['kader'].append(str(record.get('is_kader') or '').strip().lower() in KADER_TRUE_VALUES)
+            columns['dewan'].append(str(record.get('is_dewan') or '').strip().lower() in DEWAN_TRUE_VALUES)
+
+        return cls(columns)
+
+    @classmethod
+    def from_sqlite(cls, sources):
+        """Muat store dari satu atau beberapa (period, db_path)"""
+        records = []
+        for period, db_path in sources:
+            conn = sqlite3.connect(db_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                rows = conn.execute(
+                    f"SELECT {', '.join(DIMENSIONS)}, usia, ttl FROM anggota_dpr"
+                ).fetchall()
+            finally:
+                conn.close()
+            for row in rows:
+                record = dict(row)
+                record['period'] = period
+                records.append(record)
+        return cls.from_records(records)
+
+    def dimensions(self):
+        return tuple(self.codes) + (AGE_BIN_DIMENSION,)
+
+    def _dimension_codes(self, name, age_bin):
+        """Kode integer dan label untuk satu dimensi"""
+        if name != AGE_BIN_DIMENSION:
+            return self.codes[name], self.labels[name]
+
+        with self._age_bins_lock:
+            if age_bin in self._age_bins:
+                self._age_bins.move_to_end(age_bin)
+                return self._age_bins[age_bin]
+
+        valid = self.age_valid
+        bins = np.full(self.size, -1, dtype=np.int64)
+        bins[valid] = (self.age[valid] // age_bin).astype(np.int64)
+        if valid.any():
+            low, high = bins[valid].min(), bins[valid].max()
+        else:
+            low, high = 0, -1
+        edges = np.arange(low, high + 1)
+        labels = np.array(
+            [MISSING_LABEL] + [f"{b * age_bin}-{b * age_bin + age_bin - 1}" for b in edges],
+            dtype=object
+        )
+        codes = np.where(valid, bins - low + 1, 0)
+        with self._age_bins_lock:
+            self._age_bins[age_bin] = (codes, labels)
+            while len(self._age_bins) > MAX_AGE_BINS:
+                self._age_bins.popitem(last=False)
+        return codes, labels
+
+    def _median(self, age_group, ages, age_counts, present):
+        """Median usia per grup untuk grup-grup di present"""
+        c = age_counts[present]
+        has_age = c > 0
+        lower_rank = np.where(has_age, (c - 1) // 2, 0)
+        upper_rank = np.where(has_age, c // 2, 0)
+
+        if self.integer_ages:
+            # Histogram usia (0-127) per grup, lalu cari rank lewat cumsum
+            slot = np.full(age_counts.size, -1, dtype=np.int64)
+            slot[present] = np.arange(len(present))
+            hist = np.bincount(
+                slot[age_group] * 128 + ages.astype(np.int64),
+                minlength=len(present) * 128
+            ).reshape(len(present), 128)
+            cum = hist.cumsum(axis=1)
+            lower = (cum <= lower_rank[:, None]).sum(axis=1)
+            upper = (cum <= upper_rank[:, None]).sum(axis=1)
+            median = (lower + upper) / 2
+        else:
+            order = np.lexsort((ages, age_group))
+            sorted_ages = ages[order]
+            starts = np.concatenate(([0], np.cumsum(age_counts)[:-1]))[present]
+            if sorted_ages.size:
+                median = (sorted_ages[starts + lower_rank] + sorted_ages[starts + upper_rank]) / 2
+            else:
+                median = np.zeros(len(present))
+        return np.where(has_age, median, np.nan)
+
+    def aggregate(self, group_by, metrics, age_bin=10):
+        """Hitung metrik per kombinasi nilai dimensi group_by"""
+        dims = [self._dimension_codes(name, age_bin) for name in group_by]
+        shape = tuple(len(labels) for _, labels in dims)
+        n_groups = int(np.prod(shape)) if shape else 1
+        if n_groups > MAX_GROUPS:
+            raise ValueError("Kombinasi dimensi group_by terlalu banyak")
+
+        if dims:
+            group = np.ravel_multi_index(tuple(codes for codes, _ in dims), shape)
+        else:
+            group = np.zeros(self.size, dtype=np.int64)
+
+        counts = np.bincount(group, minlength=n_groups)
+        present = np.flatnonzero(counts)
+        values = {'count': counts[present]}
+
+        if 'share' in metrics:
+            # Share terhadap grup induk (semua dimensi kecuali yang terakhir)
+            if len(shape) > 1:
+                parent = present // shape[-1]
+                parent_counts = np.bincount(group // shape[-1], minlength=n_groups // shape[-1])
+                values['share'] = counts[present] / parent_counts[parent]
+            else:
+                values['share'] = counts[present] / max(self.size, 1)
+
+        if 'mean_age' in metrics or 'median_age' in metrics:
+            valid = self.age_valid
+            age_group = group[valid]
+            ages = self.age[valid]
+            age_counts = np.bincount(age_group, minlength=n_groups)
+
+            if 'mean_age' in metrics:
+                sums = np.bincount(age_group, weights=ages, minlength=n_groups)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    values['mean_age'] = (sums / age_counts)[present]
+
+            if 'median_age' in metrics:
+                values['median_age'] = self._median(age_group, ages, age_counts, present)
+
+        if 'kader_ratio' in metrics:
+            values['kader_ratio'] = np.bincount(group, weights=self.kader, minlength=n_groups)[present] / counts[present]
+        if 'dewan_ratio' in metrics:
+            values['dewan_ratio'] = np.bincount(group, weights=self.dewan, minlength=n_groups)[present] / counts[present]
+
+        keys = np.unravel_index(present, shape) if dims else ()
+        rows = []
+        for i in range(len(present)):
+            row = {name: str(labels[keys[d][i]]) for d, (name, (_, labels)) in enumerate(zip(group_by, dims))}
+            for metric in metrics:
+                value = values[metric][i]
+                if metric == 'count':
+                    row[metric] = int(value)
+                else:
+                    row[metric] = None if np.isnan(value) else round(float(value), 4)
+            rows.append(row)
+        return rows
+
+
+class AnalyticsEngine:
+    """ColumnStore per kombinasi periode plus cache hasil per bentuk query"""
+
+    def __init__(self, sources_for, cache_size=256):
+        self._sources_for = sources_for
+        self._lock = threading.Lock()
+        self._stores = {}
+        self._cache = OrderedDict()
+        self.cache_size = cache_size
+        # Naik setiap invalidate(); store/hasil yang dimuat sebelum invalidate
+        # tidak boleh masuk cache lagi
+        self._generation = 0
+
+    def store(self, periods):
+        return self._store(periods)[0]
+
+    def _store(self, periods):
+        """(store, generation saat store dimuat)"""
+        key = tuple(periods)
+        with self._lock:
+            store = self._stores.get(key)
+            generation = self._generation
+        if store is None:
+            store = ColumnStore.from_sqlite(self._sources_for(periods))
+            with self._lock:
+                if generation == self._generation:
+                    store = self._stores.setdefault(key, store)
+        return store, generation
+
+    def query(self, periods, group_by, metrics, age_bin=10):
+        """Jalankan agregasi; raise ValueError untuk parameter tidak valid"""
+        store, generation = self._store(periods)
+        unknown = [name for name in group_by if name not in store.dimensions()]
+        if unknown:
+            raise ValueError(f"Dimensi tidak dikenal: {', '.join(unknown)}")
+        if len(set(group_by)) != len(group_by):
+            raise ValueError("Dimensi group_by tidak boleh duplikat")
+        unknown = [name for name in metrics if name not in METRICS]
+        if unknown:
+            raise ValueError(f"Metrik tidak dikenal: {', '.join(unknown)}")
+        if age_bin < 1:
+            raise ValueError("age_bin harus >= 1")
+
+        key = (tuple(periods), tuple(group_by), tuple(metrics), age_bin)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        rows = store.aggregate(group_by, metrics, age_bin)
+        with self._lock:
+            if generation == self._generation:
+                self._cache[key] = rows
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return rows
+
+    def invalidate(self, periods=None):
+        """Buang store dan cache yang memuat periods (None = semua) setelah data berubah"""
+        with self._lock:
+            self._generation += 1
+            if periods is None:
+                removed = len(self._stores) + len(self._cache)
+                self._stores.clear()
+                self._cache.clear()
+                return removed
+            stale = set(periods)
+            store_keys = [key for key in self._stores if stale & set(key)]
+            cache_keys = [key for key in self._cache if stale & set(key[0])]
+            for key in store_keys:
+                del self._stores[key]
+            for key in cache_keys:
+                del self._cache[key]
+            return len(store_keys) + len(cache_keys)
+
+
+def parse_age(usia, ttl, year):
+    """Usia dari kolom usia jika valid, selain itu dari tahun lahir di TTL"""
+    try:
+        age = float(usia)
+        if 0 < age < 100:
+            return age
+    except (TypeError, ValueError):
+        pass
+    match = re.search(r'(\d{4})\s*$', str(ttl or ''))
+    if match:
+        age = year - int(match.group(1))
+        if 0 < age < 100:
+            return float(age)
+    return np.nan
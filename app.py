@@ -1,16 +1,93 @@
 # app_sqlite.py - Versi lengkap dengan tambahan tombol download dan FAQ
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, make_response
+from markupsafe import escape
+import hmac
+import json
 import sqlite3
 import os
 import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from admission import AdmissionPolicy
+from analytics import AnalyticsEngine, METRICS
+from cache import LRUCache
+from compact import CompactEncoder
+from fragments import FragmentCache, render_alert
+from live_updates import DataVersion, MemberWriter, ChangeError, MemberExists, MemberNotFound
+from periods import PERIODS, DEFAULT_PERIOD, parse_period_param
+from profiling import RequestProfiler
+from queries import (
+    SEARCH_SQL, SEARCH_PROVINSI_SQL, COUNT_SQL, COUNT_PROVINSI_SQL,
+    FRAKSI_STATS_SQL, PARTAI_STATS_SQL, FRAKSI_STATS_PROVINSI_SQL, PARTAI_STATS_PROVINSI_SQL,
+    PROVINSI_DAPIL_STATS_SQL, PROVINSI_LAHIR_STATS_SQL, IDENTITY_SQL, RELATED_SQL, MEMBERS_BY_ANGGOTA_SQL
+)
+from query_log import QueryLog
+from ranking import RankingIndex, may_match, sort_name
+from regions import Gazetteer, parse_provinsi_param
+from singleflight import SingleFlight, SingleFlightTimeout
+
 app = Flask(__name__)
 
+# Batas waktu follower menunggu hasil pencarian identik yang sedang berjalan
+SEARCH_COALESCE_TIMEOUT = float(os.environ.get('SEARCH_COALESCE_TIMEOUT', 10))
+
+# Admission control: batas konkurensi, antrean tunggu dan rate limit per client
+search_admission = AdmissionPolicy(
+    'search',
+    max_concurrent=int(os.environ.get('SEARCH_MAX_CONCURRENT', 8)),
+    max_queue=int(os.environ.get('SEARCH_MAX_QUEUE', 32)),
+    queue_timeout=float(os.environ.get('SEARCH_QUEUE_TIMEOUT', 2)),
+    rate=float(os.environ.get('SEARCH_RATE_PER_CLIENT', 5)),
+    burst=float(os.environ.get('SEARCH_BURST_PER_CLIENT', 10))
+)
+download_admission = AdmissionPolicy(
+    'download',
+    max_concurrent=int(os.environ.get('DOWNLOAD_MAX_CONCURRENT', 2)),
+    max_queue=int(os.environ.get('DOWNLOAD_MAX_QUEUE', 4)),
+    queue_timeout=float(os.environ.get('DOWNLOAD_QUEUE_TIMEOUT', 5)),
+    rate=float(os.environ.get('DOWNLOAD_RATE_PER_CLIENT', 0.2)),
+    burst=float(os.environ.get('DOWNLOAD_BURST_PER_CLIENT', 2)),
+    retry_after=5
+)
+
+# Profiling request live (opt-in): fraksi request yang diprofil, 0 = nonaktif
+profiler = RequestProfiler(
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 0)),
+    trace_allocations=os.environ.get('PROFILE_TRACEMALLOC', '0') == '1'
+)
+profiler.install(app)
+
+# Token untuk endpoint /debug; jika kosong endpoint /debug tidak tersedia
+DEBUG_TOKEN = os.environ.get('DEBUG_TOKEN', '')
+
+# Token untuk admin API perubahan data live; jika kosong admin API tidak tersedia
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+# Ranking pencarian: 'scored' (bobot per field, lihat ranking.py) atau
+# 'sql' (tier CASE lama di SEARCH_SQL)
+SEARCH_RANKING = os.environ.get('SEARCH_RANKING', 'scored')
+if SEARCH_RANKING not in ('scored', 'sql'):
+    raise ValueError(f"SEARCH_RANKING tidak dikenal: {SEARCH_RANKING}")
+
+# /health dijawab dari state cache supaya tetap responsif saat beban tinggi
+HEALTH_REFRESH_SECONDS = float(os.environ.get('HEALTH_REFRESH_SECONDS', 30))
+
 class DPRSQLiteSearch:
-    def __init__(self, db_path='dpr_data.db'):
+    def __init__(self, db_path='dpr_data.db', period=DEFAULT_PERIOD):
         self.db_path = db_path
+        self.period = period
+        self._health_lock = threading.Lock()
+        self._health = {'records': None, 'error': 'belum dicek', 'checked_at': float('-inf')}
+        self._ranking_lock = threading.Lock()
+        self._ranking = None
+        # Deteksi perubahan dari proses lain; juga koneksi tulis MemberWriter
+        self.data_watch = DataVersion(db_path)
+        self.data_watch.start()
         self.check_database()
     
     def check_database(self):
@@ -31,56 +108,211 @@ class DPRSQLiteSearch:
             print(f"❌ Error mengakses database: {e}")
             return False
     
+    def health_snapshot(self):
+        """Status database dari cache, di-refresh oleh maksimal satu thread"""
+        state = self._health
+        stale = time.monotonic() - state['checked_at'] > HEALTH_REFRESH_SECONDS
+        # Thread lain yang datang saat refresh berjalan langsung memakai cache
+        if (stale or state['error']) and self._health_lock.acquire(blocking=False):
+            try:
+                conn = self.get_db_connection()
+                try:
+                    count = conn.execute(COUNT_SQL).fetchone()[0]
+                finally:
+                    conn.close()
+                state = {'records': count, 'error': None, 'checked_at': time.monotonic()}
+            except Exception as e:
+                state = dict(state, error=str(e), checked_at=time.monotonic())
+            finally:
+                self._health = state
+                self._health_lock.release()
+        return state
+
+    def data_version(self):
+        """Versi data untuk key cache fragment; berubah setiap database ditulis ulang"""
+        try:
+            return os.stat(self.db_path).st_mtime_ns
+        except OSError:
+            return 0
+    
     def get_db_connection(self):
         """Buat koneksi database dengan row factory"""
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
         return conn
     
-    def search_by_name(self, query, limit=25):
-        """Pencarian dengan SQLite - optimized untuk Render, memuat semua field seperti app.py"""
-        if not query or not query.strip():
+    def ranking_index(self):
+        """RankingIndex periode ini, dibangun saat pertama dipakai"""
+        index = self._ranking
+        if index is None:
+            with self._ranking_lock:
+                if self._ranking is None:
+                    start = time.perf_counter()
+                    self._ranking = RankingIndex.from_sqlite(self.db_path)
+                    print(f"🏷️ Index ranking {self.period}: {len(self._ranking)} anggota "
+                          f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+                index = self._ranking
+        return index
+    
+    def apply_change(self, change):
+        """Terapkan perubahan live ke index ranking (jika sudah dibangun).
+        Lock yang sama dengan pembangunan index, jadi perubahan yang commit
+        selama index dibaca tidak terlewat."""
+        with self._ranking_lock:
+            if self._ranking is not None:
+                self._ranking.apply(change['before'], change['after'])
+    
+    def refresh_if_changed(self):
+        """True jika database diubah proses lain sejak cek terakhir; index
+        ranking dibuang dan dibangun ulang saat dipakai berikutnya"""
+        if not self.data_watch.changed():
+            return False
+        with self._ranking_lock:
+            self._ranking = None
+        return True
+    
+    @staticmethod
+    def normalize_query(query):
+        """Normalisasi query untuk key penggabungan (casefold + spasi tunggal)"""
+        return ' '.join(str(query).split()).casefold()
+
+    def search_by_name(self, query, limit=25, provinsi=None):
+        """Pencarian dengan SQLite - optimized untuk Render, memuat semua field seperti app.py
+
+        provinsi (id) membatasi ke anggota dengan dapil atau kota lahir di
+        provinsi itu; query boleh kosong jika provinsi diisi. Error database
+        diteruskan ke pemanggil supaya kegagalan sementara tidak di-cache
+        sebagai hasil kosong.
+        """
+        if provinsi is None and (not query or not query.strip()):
             return []
+        if SEARCH_RANKING == 'scored':
+            return self.search_scored(query, limit, provinsi)
         
-        query = query.strip()
+        # Spasi dinormalisasi supaya hasil konsisten dengan key penggabungan
+        query = ' '.join(str(query or '').split())
         search_pattern = f"%{query}%"
         
         conn = self.get_db_connection()
         
-        sql_query = """
-        SELECT * FROM anggota_dpr 
-        WHERE LOWER(nama) LIKE LOWER(?) 
-           OR LOWER(fraksi) LIKE LOWER(?) 
-           OR LOWER(partai) LIKE LOWER(?)
-           OR LOWER(dapil) LIKE LOWER(?)
-        ORDER BY 
-            CASE 
-                WHEN LOWER(nama) LIKE LOWER(?) THEN 1
-                WHEN LOWER(fraksi) LIKE LOWER(?) THEN 2
-                ELSE 3
-            END,
-            nama
-        LIMIT ?
-        """
-        
         try:
-            cursor = conn.execute(sql_query, [
-                search_pattern, search_pattern, search_pattern, search_pattern,
-                search_pattern, search_pattern, limit
-            ])
-            
+            if provinsi is None:
+                cursor = conn.execute(SEARCH_SQL, {'pattern': search_pattern, 'limit': limit})
+            else:
+                cursor = conn.execute(SEARCH_PROVINSI_SQL, {
+                    'pattern': search_pattern, 'limit': limit, 'provinsi': provinsi
+                })
             results = cursor.fetchall()
+        finally:
             conn.close()
-            
-            # Clean records mirip dengan app.py
-            cleaned_results = [self.clean_member_record(dict(row)) for row in results]
-            
-            return cleaned_results
-            
-        except Exception as e:
-            print(f"Search error: {e}")
-            conn.close()
+        
+        # Clean records mirip dengan app.py
+        cleaned_results = [self.clean_member_record(dict(row)) for row in results]
+        for record in cleaned_results:
+            record['period'] = self.period
+        
+        return cleaned_results
+
+    def search_scored(self, query, limit=25, provinsi=None):
+        """Pencarian dengan RankingIndex: top-k dipilih di memori, hanya
+        `limit` baris yang diambil lengkap dari database"""
+        hits = self.ranking_index().top_k(query, limit, provinsi)
+        if not hits:
             return []
+        
+        conn = self.get_db_connection()
+        try:
+            rows = conn.execute(MEMBERS_BY_ANGGOTA_SQL, [json.dumps([anggota for anggota, _ in hits])]).fetchall()
+        finally:
+            conn.close()
+        
+        by_anggota = {row['anggota']: dict(row) for row in rows}
+        results = []
+        for anggota, score in hits:
+            # Baris yang terhapus setelah index dibaca dilewati
+            if anggota not in by_anggota:
+                continue
+            record = self.clean_member_record(by_anggota[anggota])
+            record['period'] = self.period
+            record['score'] = score
+            results.append(record)
+        return results
+
+    @staticmethod
+    def match_rank(record, needle):
+        """Tier ranking yang sama dengan ORDER BY CASE di search_by_name"""
+        if needle in str(record.get('nama', '')).casefold():
+            return 1
+        if needle in str(record.get('fraksi', '')).casefold():
+            return 2
+        return 3
+
+    def find_by_identity(self, identity_key):
+        """Cari anggota berdasarkan key identitas lintas periode"""
+        conn = self.get_db_connection()
+        try:
+            rows = conn.execute(
+                IDENTITY_SQL, [identity_key]
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Identity lookup error ({self.period}): {e}")
+            rows = []
+        finally:
+            conn.close()
+
+        records = [self.clean_member_record(dict(row)) for row in rows]
+        for record in records:
+            record['period'] = self.period
+        return records
+
+    def get_related(self, anggota, limit=10):
+        """Anggota terkait yang sudah dihitung saat import; None jika belum tersedia"""
+        conn = self.get_db_connection()
+        try:
+            rows = conn.execute(RELATED_SQL, [anggota, limit]).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"Related lookup error ({self.period}): {e}")
+            return None
+        finally:
+            conn.close()
+
+        related = []
+        for row in rows:
+            record = dict(row)
+            record['shared'] = json.loads(record['shared'] or '[]')
+            related.append(record)
+        return related
+
+    def get_stats(self, top=10, provinsi=None):
+        """Total anggota dan jumlah anggota per fraksi/partai.
+
+        Tanpa filter provinsi juga menghitung jumlah anggota per provinsi
+        dapil dan provinsi kelahiran, sebagai list (id, nama, jumlah).
+        """
+        conn = self.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            if provinsi is None:
+                cursor.execute(COUNT_SQL)
+                total = cursor.fetchone()[0]
+                fraksi_stats = [tuple(row) for row in cursor.execute(FRAKSI_STATS_SQL, [top])]
+                partai_stats = [tuple(row) for row in cursor.execute(PARTAI_STATS_SQL, [top])]
+                provinsi_dapil = [tuple(row) for row in cursor.execute(PROVINSI_DAPIL_STATS_SQL)]
+                provinsi_lahir = [tuple(row) for row in cursor.execute(PROVINSI_LAHIR_STATS_SQL)]
+            else:
+                params = {'provinsi': provinsi, 'top': top}
+                cursor.execute(COUNT_PROVINSI_SQL, params)
+                total = cursor.fetchone()[0]
+                fraksi_stats = [tuple(row) for row in cursor.execute(FRAKSI_STATS_PROVINSI_SQL, params)]
+                partai_stats = [tuple(row) for row in cursor.execute(PARTAI_STATS_PROVINSI_SQL, params)]
+                provinsi_dapil = provinsi_lahir = []
+        finally:
+            conn.close()
+
+        return {
+            'total': total, 'fraksi': fraksi_stats, 'partai': partai_stats,
+            'provinsi_dapil': provinsi_dapil, 'provinsi_lahir': provinsi_lahir
+        }
 
     def clean_member_record(self, record):
         """Clean up a member record for display, mirip dengan fungsi di app.py"""
@@ -98,6 +330,10 @@ class DPRSQLiteSearch:
             else:
                 record['kota_lahir'] = 'Tidak tersedia'
         
+        # Nama provinsi dari key wilayah hasil import
+        record['provinsi_dapil'] = gazetteer.province_name(record.get('dapil_provinsi_id'))
+        record['provinsi_lahir'] = gazetteer.province_name(record.get('lahir_provinsi_id'))
+        
         # Ensure usia is calculated
         if 'usia' not in record or not record['usia']:
             if 'ttl' in record:
@@ -213,8 +449,202 @@ class DPRSQLiteSearch:
         
         return None
 
-# Initialize search engine
-dpr_search = DPRSQLiteSearch()
+# Gazetteer wilayah untuk parameter provinsi= dan nama provinsi di hasil
+gazetteer = Gazetteer.load()
+
+# Initialize search engine, satu per periode yang database-nya tersedia
+dpr_searches = {
+    period: DPRSQLiteSearch(config['db'], period)
+    for period, config in PERIODS.items()
+    if period == DEFAULT_PERIOD or os.path.exists(config['db'])
+}
+dpr_search = dpr_searches[DEFAULT_PERIOD]
+
+# Kamus string statis untuk format respons compact, dibangun sekali saat startup
+compact_encoder = CompactEncoder.from_databases(
+    [engine.db_path for engine in dpr_searches.values()],
+    extra=list(PERIODS) + list(gazetteer.provinces.values())
+)
+
+# Query lintas periode dijalankan paralel, satu thread per database periode
+period_executor = ThreadPoolExecutor(max_workers=len(PERIODS), thread_name_prefix='period')
+
+def fan_out(periods, fn):
+    """Jalankan fn(search_engine) untuk setiap periode, paralel jika lebih dari satu"""
+    if len(periods) == 1:
+        return {periods[0]: fn(dpr_searches[periods[0]])}
+    futures = {period: period_executor.submit(fn, dpr_searches[period]) for period in periods}
+    return {period: future.result() for period, future in futures.items()}
+
+# Analitik ad-hoc di atas kolom NumPy, dimuat sekali per kombinasi periode
+analytics_engine = AnalyticsEngine(
+    lambda periods: [(period, dpr_searches[period].db_path) for period in periods]
+)
+
+def search_periods(query, periods, limit=25, provinsi=None):
+    """Pencarian di satu atau beberapa periode, hasil digabung sesuai ranking"""
+    results = fan_out(periods, lambda engine: engine.search_by_name(query, limit, provinsi))
+    if len(periods) == 1:
+        return results[periods[0]]
+
+    # Periode terbaru didahulukan jika skor/tier dan nama sama
+    newest_first = {period: -i for i, period in enumerate(PERIODS)}
+    merged = [record for period in periods for record in results[period]]
+    if SEARCH_RANKING == 'scored':
+        merged.sort(key=lambda r: (-r['score'], sort_name(r['nama']), newest_first[r['period']]))
+    else:
+        needle = ' '.join(query.split()).casefold()
+        merged.sort(key=lambda r: (DPRSQLiteSearch.match_rank(r, needle), r['nama'], newest_first[r['period']]))
+    return merged[:limit]
+
+# Request /search identik yang datang bersamaan berbagi satu query
+search_flight = SingleFlight()
+
+# Cache hasil pencarian per (query ternormalisasi, periode)
+search_cache = LRUCache(int(os.environ.get('SEARCH_CACHE_SIZE', 1024)))
+
+# Kartu hasil HTML untuk GET /search, per (periode, anggota, versi data)
+fragment_cache = FragmentCache(int(os.environ.get('FRAGMENT_CACHE_SIZE', 4096)))
+
+# Fragment hasil boleh disimpan cache HTTP/CDN selama ini (detik)
+FRAGMENT_MAX_AGE = int(os.environ.get('FRAGMENT_MAX_AGE', 60))
+
+# Log query pencarian (kosongkan QUERY_LOG_PATH untuk menonaktifkan)
+QUERY_LOG_PATH = os.environ.get('QUERY_LOG_PATH', 'query_log.db')
+query_log = QueryLog(
+    QUERY_LOG_PATH,
+    retention_days=float(os.environ.get('QUERY_LOG_RETENTION_DAYS', 30)),
+    max_rows=int(os.environ.get('QUERY_LOG_MAX_ROWS', 200_000))
+) if QUERY_LOG_PATH else None
+
+# Jumlah query terpopuler dari log yang dijalankan ulang saat startup
+WARM_TOP_QUERIES = int(os.environ.get('WARM_TOP_QUERIES', 50))
+
+# Naik setiap ada perubahan data live. Hasil yang mulai dihitung sebelum
+# perubahan tidak disimpan ke cache, supaya tidak menimpa invalidasi.
+cache_generation = 0
+cache_generation_lock = threading.Lock()
+
+def cache_put(key, value, generation):
+    with cache_generation_lock:
+        if generation == cache_generation:
+            search_cache.put(key, value)
+
+def cached_search(query, periods, provinsi=None):
+    """Pencarian lewat cache hasil dan single-flight.
+
+    Exception dari pencarian diteruskan ke semua pemanggil dan tidak
+    di-cache, jadi kegagalan sementara tidak menjadi hasil kosong.
+    """
+    check_external_changes(periods)
+    key = ('search', dpr_search.normalize_query(query), tuple(periods), provinsi)
+    results = search_cache.get(key)
+    if results is None:
+        def compute():
+            generation = cache_generation
+            results = search_periods(query, periods, provinsi=provinsi)
+            cache_put(key, results, generation)
+            return results
+        results = search_flight.do(key, compute, timeout=SEARCH_COALESCE_TIMEOUT)
+    return results
+
+def cached_compact(query, periods, provinsi, results, generation):
+    """Payload format=compact untuk hasil pencarian, disimpan di cache yang sama"""
+    key = ('compact', dpr_search.normalize_query(query), tuple(periods), provinsi)
+    payload = search_cache.get(key)
+    if payload is None:
+        payload = compact_encoder.encode(results)
+        cache_put(key, payload, generation)
+    return payload
+
+def record_matches(record, needle, provinsi):
+    """Apakah record bisa muncul di hasil pencarian (needle, provinsi).
+
+    Versi longgar dari kedua engine ranking (setiap token query ada di salah
+    satu field ranking, mencakup WHERE di SEARCH_SQL), jadi paling buruk
+    membuang entry yang sebenarnya tidak berubah.
+    """
+    if record is None:
+        return False
+    if provinsi is not None and provinsi not in (record.get('dapil_provinsi_id'), record.get('lahir_provinsi_id')):
+        return False
+    return may_match(record, needle)
+
+def invalidate_change(change):
+    """Subscriber perubahan live: buang hanya entry cache yang terpengaruh"""
+    global cache_generation
+    period, before, after = change['period'], change['before'], change['after']
+    # Index diperbarui dulu: hasil yang dihitung dari index lama masih
+    # memegang generation lama sehingga tidak tersimpan ke cache
+    dpr_searches[period].apply_change(change)
+    with cache_generation_lock:
+        cache_generation += 1
+    
+    def affected(key):
+        kind, needle, periods, provinsi = key
+        return period in periods and (record_matches(before, needle, provinsi) or record_matches(after, needle, provinsi))
+    
+    change['invalidated'] = {
+        'search_cache': search_cache.invalidate(affected),
+        'fragment_cache': fragment_cache.invalidate(period, change['anggota']),
+        'analytics': analytics_engine.invalidate([period]),
+    }
+
+def check_external_changes(periods):
+    """Buang semua cache periode yang database-nya diubah proses lain
+    (admin API di worker lain, import ulang); perubahan dari proses ini
+    sudah ditangani invalidate_change"""
+    global cache_generation
+    for period in periods:
+        if not dpr_searches[period].refresh_if_changed():
+            continue
+        with cache_generation_lock:
+            cache_generation += 1
+        removed = search_cache.invalidate(lambda key: period in key[2])
+        analytics_engine.invalidate([period])
+        print(f"🔄 Database {period} diubah proses lain, {removed} entry cache dibuang")
+
+def attach_member_writer(period, engine):
+    """MemberWriter untuk engine periode; setiap perubahan diteruskan ke invalidate_change"""
+    writer = MemberWriter(engine.db_path, period, gazetteer, data_version=engine.data_watch)
+    writer.subscribe(invalidate_change)
+    return writer
+
+# Writer per periode untuk admin API (hanya jika ADMIN_TOKEN diisi)
+member_writers = {}
+if ADMIN_TOKEN:
+    for period, engine in dpr_searches.items():
+        if os.path.exists(engine.db_path):
+            member_writers[period] = attach_member_writer(period, engine)
+
+def warm_search_cache(top_n=WARM_TOP_QUERIES):
+    """Isi cache hasil dengan query terpopuler dari log"""
+    if query_log is None or top_n <= 0:
+        return 0
+    
+    warmed = 0
+    start = time.perf_counter()
+    try:
+        popular = query_log.top_queries(limit=top_n)
+    except sqlite3.Error as e:
+        print(f"⚠️ Gagal membaca query log untuk warming: {e}")
+        return 0
+    
+    for entry in popular:
+        periods = [p for p in (entry['periods'] or DEFAULT_PERIOD).split(',') if p in dpr_searches]
+        if not periods:
+            continue
+        try:
+            cached_search(entry['query'], periods)
+            warmed += 1
+        except Exception as e:
+            print(f"⚠️ Warming gagal untuk {entry['query']!r}: {e}")
+    
+    print(f"🔥 Cache pencarian di-warm dengan {warmed} query ({(time.perf_counter() - start) * 1000:.0f} ms)")
+    return warmed
+
+# Warming berjalan di background supaya /health langsung bisa dijawab
+threading.Thread(target=warm_search_cache, name='cache-warm', daemon=True).start()
 
 @app.route('/')
 def index():
@@ -446,7 +876,6 @@ def index():
                 <p class="mb-0">
                     <small>
                         Powered by Flask + SQLite • Hosted on Render
-                        <a href="/debug" class="text-white ms-2">Debug Info</a> |
                         <a href="/stats" class="text-white ms-2">Statistik</a>
                     </small>
                 </p>
@@ -470,6 +899,52 @@ def index():
 
         <script src="https://cdnjs.cloudflare.com/ajax/libs/bootstrap/5.1.3/js/bootstrap.bundle.min.js"></script>
         <script>
+            const SERVER_RENDER = new URLSearchParams(window.location.search).get('render') === 'server';
+            const COMPACT_FORMAT = new URLSearchParams(window.location.search).get('format') === 'compact';
+            let compactDictionary = null;
+
+            // Kamus statis diambil sekali dan dipakai ulang selama versinya sama;
+            // ?v= membuat URL berbeda per versi sehingga cache browser tidak
+            // pernah memberi kamus lama. null jika server sudah ganti kamus.
+            function loadDictionary(version) {
+                if (compactDictionary && compactDictionary.version === version) {
+                    return Promise.resolve(compactDictionary);
+                }
+                return fetch('/search/dictionary?v=' + encodeURIComponent(version))
+                    .then(response => response.json())
+                    .then(dictionary => dictionary.version === version ? (compactDictionary = dictionary) : null);
+            }
+
+            // Ubah respons format=compact kembali menjadi data.results
+            function decodeCompact(data) {
+                if (data.format !== 'compact') {
+                    return Promise.resolve(data);
+                }
+                return loadDictionary(data.dictionary).then(dictionary => {
+                    if (!dictionary) {
+                        // Versi kamus tidak cocok: ulangi pencarian tanpa format compact
+                        return fetch('/search', {
+                            method: 'POST',
+                            headers: {'Content-Type': 'application/json'},
+                            body: JSON.stringify({query: data.query})
+                        }).then(response => response.json());
+                    }
+                    const table = dictionary.strings.concat(data.strings);
+                    const encoded = new Set(data.encoded);
+                    const results = [];
+                    for (let i = 0; i < data.count; i++) {
+                        const member = {};
+                        for (const field of data.fields) {
+                            const value = data.columns[field][i];
+                            member[field] = encoded.has(field) && value !== null ? table[value] : value;
+                        }
+                        results.push(member);
+                    }
+                    data.results = results;
+                    return data;
+                });
+            }
+
             function searchMembers() {
                 const query = document.getElementById('searchBox').value.trim();
                 const resultsDiv = document.getElementById('results');
@@ -483,12 +958,28 @@ def index():
                 loadingDiv.style.display = 'block';
                 resultsDiv.innerHTML = '';
 
+                // Mode render server (?render=server): kartu HTML siap tempel
+                if (SERVER_RENDER) {
+                    fetch(`/search?q=${encodeURIComponent(query)}`)
+                    .then(response => response.text())
+                    .then(html => {
+                        loadingDiv.style.display = 'none';
+                        resultsDiv.innerHTML = html;
+                    })
+                    .catch(error => {
+                        loadingDiv.style.display = 'none';
+                        resultsDiv.innerHTML = `<div class="alert alert-danger"><i class="fas fa-exclamation-triangle"></i> Error: ${error.message}</div>`;
+                    });
+                    return;
+                }
+
                 fetch('/search', {
                     method: 'POST',
                     headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({query: query})
+                    body: JSON.stringify(COMPACT_FORMAT ? {query: query, format: 'compact'} : {query: query})
                 })
                 .then(response => response.json())
+                .then(decodeCompact)
                 .then(data => {
                     loadingDiv.style.display = 'none';
                     
@@ -587,29 +1078,108 @@ def index():
     '''
 
 @app.route('/search', methods=['POST'])
+@search_admission
 def search():
     """Handle search requests"""
+    started = time.perf_counter()
     try:
         data = request.get_json()
         query = data.get('query', '').strip()
         
-        if not query:
+        try:
+            periods = parse_period_param(data.get('period'), dpr_searches)
+            provinsi = parse_provinsi_param(data.get('provinsi'), gazetteer)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not query and provinsi is None:
             return jsonify({'error': 'Silakan masukkan kata kunci pencarian'})
         
-        results = dpr_search.search_by_name(query)
+        generation = cache_generation
+        try:
+            results = cached_search(query, periods, provinsi)
+        except SingleFlightTimeout:
+            return jsonify({'error': 'Pencarian terlalu lama, silakan coba lagi'}), 504
         
-        return jsonify({
-            'results': results,
+        # Hanya query teks yang dicatat; warming menjalankan ulang log tanpa filter provinsi
+        if query_log is not None and provinsi is None:
+            latency_ms = (time.perf_counter() - started) * 1000
+            query_log.record(dpr_search.normalize_query(query), periods, len(results), latency_ms)
+        
+        response = {
             'count': len(results),
             'query': query,
+            'periods': periods,
+            'provinsi': gazetteer.province_name(provinsi),
             'success': True
-        })
+        }
+        # format=compact: kolom index ke tabel string, lihat /search/dictionary
+        if data.get('format') == 'compact':
+            response.update(cached_compact(query, periods, provinsi, results, generation))
+        else:
+            response['results'] = results
+        return jsonify(response)
     
     except Exception as e:
         print(f"Search error: {e}")
         return jsonify({'error': f'Terjadi kesalahan: {str(e)}'})
 
+@app.route('/search', methods=['GET'])
+@search_admission
+def search_fragment():
+    """Hasil pencarian sebagai fragment HTML: ?q=&period=&provinsi="""
+    started = time.perf_counter()
+    query = request.args.get('q', '').strip()
+    
+    try:
+        periods = parse_period_param(request.args.get('period'), dpr_searches)
+        provinsi = parse_provinsi_param(request.args.get('provinsi'), gazetteer)
+    except ValueError as e:
+        return render_alert('danger', 'exclamation-circle', escape(str(e))), 400
+    
+    if not query and provinsi is None:
+        return render_alert('warning', 'exclamation-triangle', 'Masukkan kata kunci pencarian')
+    
+    # Versi dibaca sebelum hasil supaya kartu dari hasil lama tidak tersimpan di versi baru
+    versions = {period: dpr_searches[period].data_version() for period in periods}
+    try:
+        results = cached_search(query, periods, provinsi)
+    except SingleFlightTimeout:
+        return render_alert('danger', 'exclamation-circle', 'Pencarian terlalu lama, silakan coba lagi'), 504
+    except Exception as e:
+        print(f"Search error: {e}")
+        response = make_response(render_alert('danger', 'exclamation-circle', 'Terjadi kesalahan, silakan coba lagi'), 503)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    
+    response = make_response(fragment_cache.render_results(results, query, versions))
+    response.headers['Content-Type'] = 'text/html; charset=utf-8'
+    response.headers['Cache-Control'] = f'public, max-age={FRAGMENT_MAX_AGE}'
+    response.add_etag()
+    
+    if query_log is not None and provinsi is None:
+        latency_ms = (time.perf_counter() - started) * 1000
+        query_log.record(dpr_search.normalize_query(query), periods, len(results), latency_ms)
+    
+    return response.make_conditional(request)
+
+@app.route('/search/dictionary')
+def search_dictionary():
+    """Kamus string statis untuk mendekode respons format=compact.
+
+    Hanya URL ?v=<versi> yang cocok boleh di-cache lama; tanpa versi (atau
+    versi lama) klien harus revalidasi lewat ETag.
+    """
+    response = jsonify(compact_encoder.dictionary())
+    if request.args.get('v') == compact_encoder.version:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    response.set_etag(compact_encoder.version)
+    return response.make_conditional(request)
+
 @app.route('/download')
+@download_admission
 def download():
     """Provide download link for CSV data"""
     csv_path = 'dpr_data_clean.csv'
@@ -620,29 +1190,34 @@ def download():
 
 @app.route('/health')
 def health_check():
-    """Health check untuk Render"""
-    try:
-        conn = dpr_search.get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM anggota_dpr")
-        count = cursor.fetchone()[0]
-        conn.close()
-        
+    """Health check untuk Render, tanpa admission control dan dari state cache"""
+    state = dpr_search.health_snapshot()
+    if state['error'] is None:
         return jsonify({
             'status': 'healthy',
             'database': 'connected',
-            'records': count,
+            'records': state['records'],
+            'periods': list(dpr_searches),
             'version': 'render-optimized'
         })
-    except Exception as e:
-        return jsonify({
-            'status': 'unhealthy',
-            'error': str(e)
-        }), 500
+    return jsonify({
+        'status': 'unhealthy',
+        'error': state['error']
+    }), 500
+
+def debug_authorized():
+    """Cek token debug dari header X-Debug-Token (tidak lewat query string
+    supaya token tidak tercatat di access log)"""
+    if not DEBUG_TOKEN:
+        return False
+    token = request.headers.get('X-Debug-Token', '')
+    return hmac.compare_digest(token.encode(), DEBUG_TOKEN.encode())
 
 @app.route('/debug')
 def debug_info():
-    """Debug info"""
+    """Debug info (butuh DEBUG_TOKEN)"""
+    if not debug_authorized():
+        return jsonify({'error': 'Not found'}), 404
     try:
         conn = dpr_search.get_db_connection()
         cursor = conn.cursor()
@@ -662,41 +1237,274 @@ def debug_info():
             'database_exists': os.path.exists(dpr_search.db_path),
             'total_rows': total_rows,
             'sample_data': sample_data,
-            'environment': dict(os.environ)
+            'profiling': {
+                'enabled': profiler.enabled,
+                'sample_rate': profiler.sample_rate,
+                'tracemalloc': profiler.trace_allocations,
+                'sampled_requests': profiler.sampled
+            }
         })
         
     except Exception as e:
         return jsonify({'error': f'Debug error: {str(e)}'}), 500
 
+@app.route('/debug/profile')
+def debug_profile():
+    """Ringkasan profil: fungsi teratas dan lokasi alokasi teratas"""
+    if not debug_authorized():
+        return jsonify({'error': 'Not found'}), 404
+    try:
+        limit = min(int(request.args.get('limit', 25)), 200)
+    except ValueError:
+        return jsonify({'error': 'Parameter limit tidak valid'}), 400
+    sort = 'tottime' if request.args.get('sort') == 'tottime' else 'cumulative'
+    return jsonify({
+        'enabled': profiler.enabled,
+        'sampled_requests': profiler.sampled,
+        'since': profiler.started_at,
+        'top_functions': profiler.top_functions(limit, sort),
+        'top_allocations': profiler.top_allocations(limit)
+    })
+
+@app.route('/debug/profile/stacks')
+def debug_profile_stacks():
+    """Collapsed stacks untuk flamegraph.pl / speedscope"""
+    if not debug_authorized():
+        return jsonify({'error': 'Not found'}), 404
+    return Response(profiler.sampler.collapsed(), mimetype='text/plain')
+
+@app.route('/debug/profile/reset', methods=['POST'])
+def debug_profile_reset():
+    """Kosongkan data profil yang sudah terkumpul"""
+    if not debug_authorized():
+        return jsonify({'error': 'Not found'}), 404
+    profiler.reset()
+    return jsonify({'status': 'OK'})
+
+@app.route('/metrics')
+def metrics():
+    """Metrik runtime instance"""
+    return jsonify({
+        'search_coalescing': search_flight.stats(),
+        'search_cache': search_cache.stats(),
+        'fragment_cache': fragment_cache.stats(),
+        'ranking': {
+            'engine': SEARCH_RANKING,
+            'documents': {
+                period: len(engine._ranking) for period, engine in dpr_searches.items()
+                if engine._ranking is not None
+            }
+        },
+        'query_log': query_log.stats() if query_log is not None else None,
+        'admission': {
+            'search': search_admission.stats(),
+            'download': download_admission.stats()
+        }
+    })
+
 @app.route('/stats')
 def get_stats():
-    """Statistik data"""
+    """Statistik data, per periode atau gabungan beberapa periode"""
     try:
-        conn = dpr_search.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Basic stats
-        cursor.execute("SELECT COUNT(*) FROM anggota_dpr")
-        total = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT fraksi, COUNT(*) FROM anggota_dpr GROUP BY fraksi ORDER BY COUNT(*) DESC LIMIT 10")
-        fraksi_stats = cursor.fetchall()
+        periods = parse_period_param(request.args.get('period'), dpr_searches)
+        provinsi = parse_provinsi_param(request.args.get('provinsi'), gazetteer)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        # Untuk gabungan, top-N dihitung dari hitungan penuh tiap periode
+        top = 10 if len(periods) == 1 else -1
+        per_period = fan_out(periods, lambda engine: engine.get_stats(top=top, provinsi=provinsi))
         
-        cursor.execute("SELECT partai, COUNT(*) FROM anggota_dpr GROUP BY partai ORDER BY COUNT(*) DESC LIMIT 10")
-        partai_stats = cursor.fetchall()
+        if len(periods) == 1:
+            stats = per_period[periods[0]]
+            total = stats['total']
+            fraksi_stats = stats['fraksi']
+            partai_stats = stats['partai']
+        else:
+            total = sum(stats['total'] for stats in per_period.values())
+            fraksi_counts = Counter()
+            partai_counts = Counter()
+            for stats in per_period.values():
+                fraksi_counts.update(dict(stats['fraksi']))
+                partai_counts.update(dict(stats['partai']))
+            fraksi_stats = fraksi_counts.most_common(10)
+            partai_stats = partai_counts.most_common(10)
         
-        conn.close()
+        # Jumlah per provinsi (hanya tanpa filter provinsi), digabung lintas periode
+        provinsi_counts = {'dapil': Counter(), 'lahir': Counter()}
+        for stats in per_period.values():
+            for kind, counts in provinsi_counts.items():
+                counts.update({(row[0], row[1]): row[2] for row in stats[f'provinsi_{kind}']})
         
         return jsonify({
             'total_members': total,
             'top_fraksi': [{'name': row[0], 'count': row[1]} for row in fraksi_stats],
             'top_partai': [{'name': row[0], 'count': row[1]} for row in partai_stats],
+            'provinsi': gazetteer.province_name(provinsi),
+            'per_provinsi_dapil': [
+                {'id': key[0], 'name': key[1], 'count': count}
+                for key, count in provinsi_counts['dapil'].most_common()
+            ],
+            'per_provinsi_lahir': [
+                {'id': key[0], 'name': key[1], 'count': count}
+                for key, count in provinsi_counts['lahir'].most_common()
+            ],
+            'periods': periods,
+            'members_per_period': {period: stats['total'] for period, stats in per_period.items()},
             'platform': 'Render + SQLite'
         })
         
     except Exception as e:
         return jsonify({'error': f'Stats error: {str(e)}'}), 500
 
+@app.route('/top-queries')
+def top_queries():
+    """Laporan query terpopuler: ?limit=20&days=7 (butuh DEBUG_TOKEN)"""
+    if not debug_authorized():
+        return jsonify({'error': 'Not found'}), 404
+    if query_log is None:
+        return jsonify({'error': 'Query log tidak aktif'}), 404
+    try:
+        limit = min(int(request.args.get('limit', 20)), 500)
+        days = float(request.args.get('days', 0))
+    except ValueError:
+        return jsonify({'error': 'Parameter limit/days tidak valid'}), 400
+    
+    since = time.time() - days * 86400 if days > 0 else None
+    return jsonify({
+        'queries': query_log.top_queries(limit=limit, since=since),
+        'log': query_log.stats()
+    })
+
+@app.route('/analytics')
+def analytics():
+    """Agregasi ad-hoc: ?group_by=fraksi,usia_bin&metrics=count,mean_age&age_bin=10"""
+    group_by = [name.strip() for name in request.args.get('group_by', '').split(',') if name.strip()]
+    metrics = [name.strip() for name in request.args.get('metrics', 'count').split(',') if name.strip()]
+    try:
+        periods = parse_period_param(request.args.get('period'), dpr_searches)
+        age_bin = int(request.args.get('age_bin', 10))
+        check_external_changes(periods)
+        rows = analytics_engine.query(periods, group_by, metrics or ['count'], age_bin)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'available_metrics': list(METRICS)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Analytics error: {str(e)}'}), 500
+    
+    return jsonify({
+        'group_by': group_by,
+        'metrics': metrics or ['count'],
+        'periods': periods,
+        'groups': len(rows),
+        'rows': rows
+    })
+
+@app.route('/member/<int:anggota>/related')
+def member_related(anggota):
+    """Top-k anggota terkait (dapil, AKD, organisasi yang sama): ?k=10&period="""
+    try:
+        periods = parse_period_param(request.args.get('period'), dpr_searches)
+        k = max(1, min(int(request.args.get('k', 10)), 100))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(periods) != 1:
+        return jsonify({'error': 'Pilih satu periode'}), 400
+    
+    related = dpr_searches[periods[0]].get_related(anggota, k)
+    if related is None:
+        return jsonify({'error': 'Data anggota terkait belum tersedia, jalankan setup_database.py'}), 404
+    return jsonify({
+        'anggota': anggota,
+        'period': periods[0],
+        'count': len(related),
+        'related': related
+    })
+
+@app.route('/identity/<identity_key>')
+def identity(identity_key):
+    """Riwayat seorang anggota di semua periode berdasarkan key identitas"""
+    periods = list(dpr_searches)
+    found = fan_out(periods, lambda engine: engine.find_by_identity(identity_key))
+    records = [record for period in periods for record in found[period]]
+    if not records:
+        return jsonify({'error': 'Anggota tidak ditemukan'}), 404
+    return jsonify({
+        'identity_key': identity_key,
+        'periods': [record['period'] for record in records],
+        'records': records
+    })
+
+def admin_authorized():
+    """Cek token admin dari header X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        return False
+    token = request.headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+def apply_member_change(op, anggota=None):
+    """Jalankan insert/update/delete lewat writer periode (?period=)"""
+    if not admin_authorized():
+        return jsonify({'error': 'Not found'}), 404
+    try:
+        periods = parse_period_param(request.args.get('period'), dpr_searches)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(periods) != 1 or periods[0] not in member_writers:
+        return jsonify({'error': 'Pilih satu periode yang database-nya tersedia'}), 400
+    writer = member_writers[periods[0]]
+    
+    fields = request.get_json(silent=True)
+    if fields is None:
+        fields = {}
+    try:
+        if not isinstance(fields, dict):
+            raise ChangeError("Body harus berupa objek JSON")
+        if op == 'insert':
+            anggota = fields.pop('anggota', None)
+            if anggota is None or not str(anggota).isdigit():
+                raise ChangeError("Field anggota (angka) wajib diisi")
+            change = writer.insert(int(anggota), fields)
+        elif op == 'update':
+            change = writer.update(anggota, fields)
+        else:
+            change = writer.delete(anggota)
+    except MemberExists as e:
+        return jsonify({'error': str(e)}), 409
+    except MemberNotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except ChangeError as e:
+        return jsonify({'error': str(e)}), 400
+    except sqlite3.OperationalError as e:
+        return jsonify({'error': f'Database sibuk: {e}'}), 503
+    
+    after = change['after']
+    return jsonify({
+        'op': change['op'],
+        'period': change['period'],
+        'anggota': change['anggota'],
+        'member': dpr_searches[change['period']].clean_member_record(dict(after)) if after else None,
+        'unknown_places': change['unknown_places'],
+        'related': change['related'],
+        'invalidated': change.get('invalidated', {}),
+        'success': True
+    }), 201 if op == 'insert' else 200
+
+@app.route('/admin/members', methods=['POST'])
+def admin_insert_member():
+    """Tambah satu anggota: body JSON berisi anggota, nama, dan field lain"""
+    return apply_member_change('insert')
+
+@app.route('/admin/members/<int:anggota>', methods=['PATCH'])
+def admin_update_member(anggota):
+    """Ubah sebagian field satu anggota"""
+    return apply_member_change('update', anggota)
+
+@app.route('/admin/members/<int:anggota>', methods=['DELETE'])
+def admin_delete_member(anggota):
+    """Hapus satu anggota"""
+    return apply_member_change('delete', anggota)
+
 if __name__ == '__main__':
     # Render-specific configuration
     port = int(os.environ.get('PORT', 5000))
@@ -708,4 +1516,3 @@ if __name__ == '__main__':
     
     # Production settings untuk Render
     app.run(host='0.0.0.0', port=port, debug=False)
-
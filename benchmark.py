@@ -0,0 +1,403 @@
+# benchmark.py - Benchmark manual untuk jalur-jalur performa portal
+#
+# Pemakaian: python benchmark.py <nama> [opsi]
+#   analytics  agregasi ColumnStore di atas data sintetis (default 1 juta baris)
+#   fragments  fragment HTML GET /search vs JSON POST /search (database asli)
+#   compact    format respons compact vs JSON biasa untuk berbagai ukuran halaman
+#   live       uji konkurensi admin API lewat jalur pencarian app: tidak terblokir, basi, setengah jadi
+#   relevance  MRR dan recall@k kedua engine ranking atas relevance_cases.json
+#   ranking    latensi pencarian engine ranking vs SQL untuk berbagai ukuran data
+import argparse
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+def timed(fn, repeat=5):
+    """Jalankan fn beberapa kali, return (hasil terakhir, median detik)"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - start)
+    return result, sorted(durations)[len(durations) // 2]
+
+def bench_analytics(args):
+    """Agregasi /analytics di atas data sintetis berukuran args.rows"""
+    from analytics import ColumnStore, DIMENSIONS
+
+    rng = np.random.default_rng(42)
+    rows = args.rows
+    cardinality = {'dapil': 84, 'kota_lahir': 500, 'fraksi': 9, 'partai': 9}
+
+    start = time.perf_counter()
+    columns = {}
+    for name in DIMENSIONS + ('period',):
+        choices = np.array([f"{name}-{i}" for i in range(cardinality.get(name, 6))], dtype=object)
+        columns[name] = choices[rng.integers(0, len(choices), rows)]
+    columns['age'] = np.where(rng.random(rows) < 0.1, np.nan, rng.integers(25, 85, rows))
+    columns['kader'] = rng.random(rows) < 0.4
+    columns['dewan'] = rng.random(rows) < 0.3
+    store = ColumnStore(columns)
+    print(f"Build ColumnStore {rows:,} baris: {time.perf_counter() - start:.2f}s")
+
+    queries = [
+        (['fraksi', 'usia_bin'], ['count', 'share']),
+        (['partai', 'pendidikan_terakhir'], ['count', 'share']),
+        (['dapil'], ['count', 'kader_ratio', 'dewan_ratio']),
+        (['fraksi'], ['count', 'mean_age', 'median_age']),
+        (['dapil', 'fraksi'], ['count', 'mean_age', 'median_age', 'share']),
+    ]
+    for group_by, metrics in queries:
+        result, seconds = timed(lambda: store.aggregate(group_by, metrics))
+        print(f"  {','.join(group_by):<32} {','.join(metrics):<40} "
+              f"{len(result):>5} grup  {seconds * 1000:8.1f} ms")
+
+def load_app():
+    """Import app tanpa query log, warming dan rate limit per client"""
+    os.environ.setdefault('QUERY_LOG_PATH', '')
+    os.environ.setdefault('WARM_TOP_QUERIES', '0')
+    os.environ.setdefault('SEARCH_RATE_PER_CLIENT', '1000000')
+    os.environ.setdefault('SEARCH_BURST_PER_CLIENT', '1000000')
+    import app
+    return app
+
+def bench_fragments(args):
+    """Waktu server + ukuran payload sampai hasil bisa ditampilkan.
+
+    Estimasi time-to-first-render = waktu server + transfer gzip pada
+    args.kbps. Jalur JSON masih harus membangun kartu dengan JavaScript di
+    browser; biaya itu tidak ikut terukur di sini, jadi angka JSON adalah
+    batas bawah.
+    """
+    app = load_app()
+    client = app.app.test_client()
+    queries = ['a', 'ahmad', 'pdi', 'jawa', 'golkar', 'aceh']
+
+    def transfer_ms(size):
+        return size * 8 / args.kbps
+
+    print(f"{'Query':<10}{'Hasil':>6}  {'Jalur':<16}{'Server ms':>10}{'Bytes':>9}{'Gzip':>8}{'TTFR ms':>9}")
+    for query in queries:
+        client.post('/search', json={'query': query})  # isi cache hasil
+
+        response, json_s = timed(lambda: client.post('/search', json={'query': query}))
+        count = response.get_json()['count']
+        rows = [('json', json_s, response.get_data())]
+
+        def cold():
+            app.fragment_cache.cache.clear()
+            return client.get('/search', query_string={'q': query})
+        response, cold_s = timed(cold)
+        rows.append(('html (render)', cold_s, response.get_data()))
+
+        response, warm_s = timed(lambda: client.get('/search', query_string={'q': query}))
+        rows.append(('html (cache)', warm_s, response.get_data()))
+
+        for label, seconds, body in rows:
+            packed = len(gzip.compress(body))
+            print(f"{query:<10}{count:>6}  {label:<16}{seconds * 1000:>10.2f}{len(body):>9}{packed:>8}"
+                  f"{seconds * 1000 + transfer_ms(packed):>9.1f}")
+
+def bench_compact(args):
+    """Ukuran payload dan waktu serialisasi format compact vs list dict"""
+    app = load_app()
+    records = [
+        record for engine in app.dpr_searches.values()
+        for record in engine.search_by_name('a', limit=100_000)
+    ]
+    assert app.compact_encoder.decode(app.compact_encoder.encode(records)) == records
+
+    print(f"Kamus statis: {len(app.compact_encoder.strings)} string, "
+          f"{len(json.dumps(app.compact_encoder.dictionary(), ensure_ascii=False))} bytes (diambil sekali)")
+    print(f"{'Record':>7}  {'Format':<17}{'Serialisasi ms':>15}{'Bytes':>10}{'Gzip':>9}")
+    for size in (25, 100, len(records)):
+        page = records[:size]
+        encoded = app.compact_encoder.encode(page)
+        formats = [
+            ('json', lambda: json.dumps({'results': page}, ensure_ascii=False)),
+            ('compact', lambda: json.dumps(app.compact_encoder.encode(page), ensure_ascii=False)),
+            # Payload compact di-cache bersama hasil pencarian (cached_compact)
+            ('compact (cache)', lambda: json.dumps(encoded, ensure_ascii=False)),
+        ]
+        for label, fn in formats:
+            body, seconds = timed(fn)
+            body = body.encode('utf-8')
+            print(f"{size:>7}  {label:<17}{seconds * 1000:>15.2f}{len(body):>10}{len(gzip.compress(body)):>9}")
+
+def bench_live(args):
+    """Pembaca mencari lewat jalur app selama writer mengubah satu anggota.
+
+    Salinan database periode default dipasang sebagai engine app dengan
+    MemberWriter yang ter-subscribe ke invalidate_change, sama seperti admin
+    API. Writer mengisi fraksi dan partai dengan "Versi NNNN" yang sama dalam
+    satu transaksi. Setiap pembaca bergantian memanggil app.cached_search
+    (cache hasil + single-flight) dan app.search_periods (RankingIndex +
+    baris dari database), lalu memeriksa:
+      - setengah jadi: fraksi != partai
+      - basi: versi lebih lama dari update yang selesai sebelum pencarian
+    Setelah update terakhir, "versi <terakhir>" harus menemukan anggota itu
+    dan "versi <sebelumnya>" (di-cache sebelum update) tidak lagi. Di tengah
+    uji satu transaksi tulis ditahan args.hold detik: latensi pencarian
+    maksimum harus jauh di bawahnya. Exit code 1 jika ada yang gagal.
+    """
+    from periods import DEFAULT_PERIOD
+
+    app = load_app()
+    workdir = tempfile.mkdtemp(prefix='dpr_live_')
+    db_path = os.path.join(workdir, 'live.db')
+    source = sqlite3.connect(app.dpr_searches[DEFAULT_PERIOD].db_path)
+    target = sqlite3.connect(db_path)
+    source.backup(target)
+    source.close()
+    target.close()
+
+    original = app.dpr_searches[DEFAULT_PERIOD]
+    engine = app.dpr_searches[DEFAULT_PERIOD] = app.DPRSQLiteSearch(db_path, DEFAULT_PERIOD)
+    writer = app.attach_member_writer(DEFAULT_PERIOD, engine)
+    app.search_cache.clear()
+
+    conn = sqlite3.connect(db_path)
+    anggota, nama = conn.execute('SELECT anggota, nama FROM anggota_dpr ORDER BY anggota LIMIT 1').fetchone()
+    conn.close()
+
+    def version(n):
+        return f'Versi {n:04d}'
+
+    def find(results):
+        return next((record for record in results if record['anggota'] == anggota), None)
+
+    writer.update(anggota, {'fraksi': version(0), 'partai': version(0)})
+    # Update terakhir yang sudah selesai, termasuk invalidasi cache dan index
+    committed = [0]
+
+    stop = threading.Event()
+    stats = {'reads': 0, 'torn': 0, 'stale': 0, 'missing': 0, 'errors': 0, 'max_read_ms': 0.0}
+    stats_lock = threading.Lock()
+
+    def reader():
+        counts = dict.fromkeys(('reads', 'torn', 'stale', 'missing', 'errors'), 0)
+        slowest = 0.0
+        searches = (
+            lambda: app.cached_search(nama, [DEFAULT_PERIOD]),
+            lambda: app.search_periods(nama, [DEFAULT_PERIOD]),
+        )
+        while not stop.is_set():
+            for search in searches:
+                floor = committed[0]
+                start = time.perf_counter()
+                try:
+                    member = find(search())
+                except Exception as e:
+                    print(f"⚠️ Pencarian gagal: {e}")
+                    counts['errors'] += 1
+                    continue
+                slowest = max(slowest, time.perf_counter() - start)
+                counts['reads'] += 1
+                if member is None:
+                    counts['missing'] += 1
+                elif member['fraksi'] != member['partai']:
+                    counts['torn'] += 1
+                elif int(member['fraksi'].split()[-1]) < floor:
+                    counts['stale'] += 1
+        with stats_lock:
+            for key, value in counts.items():
+                stats[key] += value
+            stats['max_read_ms'] = max(stats['max_read_ms'], slowest * 1000)
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+
+    write_times = []
+    primed = False
+    for n in range(1, args.writes + 1):
+        if n == args.writes:
+            # Hasil versi sebelumnya masuk cache dulu; update terakhir harus membuangnya
+            primed = find(app.cached_search(version(n - 1), [DEFAULT_PERIOD])) is not None
+        start = time.perf_counter()
+        writer.update(anggota, {'fraksi': version(n), 'partai': version(n)})
+        write_times.append(time.perf_counter() - start)
+        committed[0] = n
+
+        if n == args.writes // 2:
+            # Tahan kunci tulis: pembaca WAL harus tetap jalan dari snapshot lama
+            hold = sqlite3.connect(db_path, isolation_level=None)
+            hold.execute('BEGIN IMMEDIATE')
+            hold.execute("UPDATE anggota_dpr SET fraksi = 'Ditahan' WHERE anggota = ?", [anggota])
+            time.sleep(args.hold)
+            hold.execute('ROLLBACK')
+            hold.close()
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latest = find(app.cached_search(version(args.writes), [DEFAULT_PERIOD])) is not None
+    previous = find(app.cached_search(version(args.writes - 1), [DEFAULT_PERIOD])) is not None
+    invalidated = primed and latest and not previous
+
+    app.dpr_searches[DEFAULT_PERIOD] = original
+    app.search_cache.clear()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    write_times.sort()
+    print(f"Pembaca: {args.readers} thread, {stats['reads']:,} pencarian; writer: {args.writes} update "
+          f"(median {write_times[len(write_times) // 2] * 1000:.1f} ms, maks {write_times[-1] * 1000:.1f} ms)")
+    print(f"Record setengah jadi: {stats['torn']}, hasil basi: {stats['stale']}, "
+          f"anggota hilang: {stats['missing']}, error: {stats['errors']}")
+    print(f"Cache dan index setelah update terakhir: {'sesuai' if invalidated else 'BASI'} "
+          f"(versi terakhir ditemukan: {latest}, versi sebelumnya ditemukan: {previous})")
+    print(f"Latensi pencarian maksimum: {stats['max_read_ms']:.1f} ms (transaksi tulis ditahan {args.hold * 1000:.0f} ms)")
+
+    blocked = stats['max_read_ms'] >= args.hold * 1000 / 2
+    if stats['torn'] or stats['stale'] or stats['missing'] or stats['errors'] or not invalidated or blocked:
+        print("❌ Uji konkurensi gagal")
+        sys.exit(1)
+    print("✅ Pencarian tidak pernah terblokir, tidak basi dan tidak pernah melihat record setengah jadi")
+
+RELEVANCE_CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'relevance_cases.json')
+
+def relevant_names(conn, case):
+    """Nama relevan satu kasus: daftar eksplisit atau semua anggota yang cocok dengan 'where'"""
+    if 'relevant' in case:
+        return set(case['relevant'])
+    columns = list(case['where'])
+    rows = conn.execute(
+        f"SELECT nama FROM anggota_dpr WHERE {' AND '.join(f'{column} = ?' for column in columns)}",
+        [case['where'][column] for column in columns]
+    )
+    return {nama for (nama,) in rows}
+
+def bench_relevance(args):
+    """Kualitas ranking atas relevance_cases.json untuk engine 'sql' dan 'scored'.
+
+    MRR@k = rata-rata 1/peringkat hasil relevan pertama; recall@k = hasil
+    relevan di top-k dibagi min(k, jumlah relevan). Exit code 1 jika MRR
+    engine scored di bawah args.min_mrr.
+    """
+    app = load_app()
+    with open(RELEVANCE_CASES, encoding='utf-8') as f:
+        suite = json.load(f)
+    k = suite['k']
+    engine = app.dpr_searches[suite['period']]
+    conn = sqlite3.connect(engine.db_path)
+    cases = [(case['query'], relevant_names(conn, case)) for case in suite['cases']]
+    conn.close()
+    engine.ranking_index()
+
+    rankings = ('sql', 'scored')
+    totals = {ranking: {'mrr': 0.0, 'recall': 0.0} for ranking in rankings}
+    print(f"{'Query':<20}{'Relevan':>8}" + ''.join(f"{f'{r} rank':>12}{f'{r} recall':>14}" for r in rankings))
+    for query, relevant in cases:
+        line = f"{query:<20}{len(relevant):>8}"
+        for ranking in rankings:
+            app.SEARCH_RANKING = ranking
+            names = [record['nama'] for record in engine.search_by_name(query, k)]
+            rank = next((i for i, nama in enumerate(names, 1) if nama in relevant), None)
+            recall = len(relevant & set(names)) / min(k, len(relevant))
+            totals[ranking]['mrr'] += 1 / rank if rank else 0.0
+            totals[ranking]['recall'] += recall
+            line += f"{rank or '-':>12}{recall:>14.2f}"
+        print(line)
+
+    for ranking in rankings:
+        print(f"{ranking:<7} MRR@{k}: {totals[ranking]['mrr'] / len(cases):.3f}  "
+              f"recall@{k}: {totals[ranking]['recall'] / len(cases):.3f}")
+    if totals['scored']['mrr'] / len(cases) < args.min_mrr:
+        print(f"❌ MRR engine scored di bawah {args.min_mrr}")
+        sys.exit(1)
+
+def synthetic_database(db_path, rows):
+    """Database sintetis berisi args.rows anggota, disalin berulang dari
+    database periode default; salinan ke-n diberi nama belakang berbeda"""
+    from periods import PERIODS, DEFAULT_PERIOD
+    from queries import INDEXES
+    from setup_database import SCHEMA_SQL
+
+    source = sqlite3.connect(PERIODS[DEFAULT_PERIOD]['db'])
+    source.row_factory = sqlite3.Row
+    members = [dict(row) for row in source.execute('SELECT * FROM anggota_dpr ORDER BY id')]
+    source.close()
+    columns = [column for column in members[0] if column != 'id']
+
+    conn = sqlite3.connect(db_path)
+    conn.execute(SCHEMA_SQL)
+    batch = []
+    for i in range(rows):
+        record = dict(members[i % len(members)], anggota=i + 1)
+        copy = i // len(members)
+        if copy:
+            record['nama'] = f"{record['nama']} SALINAN{copy}"
+        batch.append([record[column] for column in columns])
+    with conn:
+        conn.executemany(
+            f"INSERT INTO anggota_dpr ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", batch
+        )
+        for statement in INDEXES:
+            conn.execute(statement)
+    conn.close()
+
+def bench_ranking(args):
+    """Latensi top-k (limit 25) engine scored vs SEARCH_SQL per ukuran data.
+
+    Waktu scored mencakup pemilihan top-k di memori dan pengambilan baris
+    lengkap lewat MEMBERS_BY_ANGGOTA_SQL; waktu bangun index dicetak terpisah.
+    """
+    from queries import SEARCH_SQL, MEMBERS_BY_ANGGOTA_SQL
+    from ranking import RankingIndex
+
+    queries = ['a', 'ahmad', 'jawa barat', 'golkar', 'puan maharani', 'tidak ada']
+    workdir = tempfile.mkdtemp(prefix='dpr_ranking_')
+    try:
+        for rows in (int(size) for size in args.sizes.split(',')):
+            db_path = os.path.join(workdir, f'ranking_{rows}.db')
+            synthetic_database(db_path, rows)
+            index, build_s = timed(lambda: RankingIndex.from_sqlite(db_path), repeat=1)
+            print(f"\n{rows:,} anggota — bangun index ranking {build_s * 1000:.0f} ms")
+            print(f"  {'Query':<16}{'SQL ms':>10}{'Scored ms':>11}{'Kandidat':>10}")
+
+            conn = sqlite3.connect(db_path)
+            for query in queries:
+                _, sql_s = timed(lambda: conn.execute(SEARCH_SQL, {'pattern': f'%{query}%', 'limit': 25}).fetchall())
+
+                def scored():
+                    hits = index.top_k(query, 25)
+                    ids = json.dumps([anggota for anggota, _ in hits])
+                    return conn.execute(MEMBERS_BY_ANGGOTA_SQL, [ids]).fetchall()
+                _, scored_s = timed(scored)
+                candidates = index.candidates(query)
+                print(f"  {query:<16}{sql_s * 1000:>10.2f}{scored_s * 1000:>11.2f}{candidates:>10,}")
+            conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+BENCHMARKS = {
+    'analytics': bench_analytics,
+    'compact': bench_compact,
+    'fragments': bench_fragments,
+    'live': bench_live,
+    'ranking': bench_ranking,
+    'relevance': bench_relevance,
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark Portal Data DPR')
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Jumlah baris data sintetis')
+    parser.add_argument('--kbps', type=float, default=1000, help='Bandwidth klien untuk estimasi transfer')
+    parser.add_argument('--readers', type=int, default=8, help='Jumlah thread pembaca (live)')
+    parser.add_argument('--writes', type=int, default=50, help='Jumlah update oleh writer (live)')
+    parser.add_argument('--hold', type=float, default=0.5, help='Lama transaksi tulis ditahan, detik (live)')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Ukuran data dipisah koma (ranking)')
+    parser.add_argument('--min-mrr', type=float, default=0.9, help='MRR minimum engine scored (relevance)')
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
@@ -0,0 +1,113 @@
+# compact.py - Format respons pencarian ringkas (opt-in, format=compact)
+#
+# Record tidak dikirim sebagai list dict, melainkan kolom-kolom berisi index
+# ke tabel string. Nilai dimensi statis (fraksi, partai, dapil, ...) punya
+# index tetap dari kamus yang dibangun saat startup dan diambil klien sekali
+# lewat /search/dictionary; string lain masuk tabel per respons.
+import hashlib
+import json
+import sqlite3
+
+# Kolom anggota_dpr yang nilainya berulang dan dimasukkan ke kamus statis
+STATIC_COLUMNS = (
+    'fraksi', 'partai', 'dapil', 'agama', 'pendidikan_terakhir', 'usia_kategori',
+    'kota_lahir', 'is_kader', 'is_dewan',
+)
+
+# Nilai default dari clean_member_record yang muncul di banyak record
+DEFAULT_STRINGS = ('', 'Tidak tersedia')
+
+
+class CompactEncoder:
+    """Encoder record pencarian ke format kolom + tabel string.
+
+    Index < len(kamus statis) merujuk kamus (/search/dictionary), index
+    selanjutnya merujuk list 'strings' di respons itu sendiri. Kolom yang
+    semua nilainya angka/null atau teks yang jarang berulang dikirim apa
+    adanya (tidak tercantum di 'encoded').
+    """
+
+    def __init__(self, strings):
+        self.strings = list(dict.fromkeys(strings))
+        self.index = {value: i for i, value in enumerate(self.strings)}
+        digest = hashlib.sha1(json.dumps(self.strings, ensure_ascii=False).encode('utf-8'))
+        self.version = digest.hexdigest()[:12]
+
+    @classmethod
+    def from_databases(cls, db_paths, extra=()):
+        """Kamus statis dari nilai distinct STATIC_COLUMNS di semua database"""
+        strings = list(DEFAULT_STRINGS) + list(extra)
+        for db_path in db_paths:
+            try:
+                conn = sqlite3.connect(db_path)
+                try:
+                    for column in STATIC_COLUMNS:
+                        rows = conn.execute(
+                            f"SELECT DISTINCT {column} FROM anggota_dpr WHERE {column} IS NOT NULL ORDER BY 1"
+                        )
+                        strings.extend(str(value) for (value,) in rows)
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                print(f"⚠️ Kamus compact tanpa {db_path}: {e}")
+        return cls(strings)
+
+    def dictionary(self):
+        return {'version': self.version, 'strings': self.strings}
+
+    def encode(self, records):
+        """Dict berisi fields, encoded (kolom ber-index), strings, columns"""
+        # Record dari satu SELECT punya key yang sama dan berurutan sama,
+        # jadi kolom bisa diambil dengan zip() tanpa loop Python per nilai
+        shapes = set(map(tuple, records))
+        if len(shapes) == 1:
+            fields = list(shapes.pop())
+            value_columns = list(zip(*map(dict.values, records)))
+        else:
+            fields = list(dict.fromkeys(field for record in records for field in record))
+            value_columns = [[record.get(field) for record in records] for field in fields]
+
+        base = len(self.strings)
+        strings = []
+        columns = {}
+        encoded = []
+
+        for field, values in zip(fields, value_columns):
+            unique = dict.fromkeys(values)
+            unique.pop(None, None)
+            # Tabel hanya menguntungkan jika sebagian besar nilai ada di kamus
+            # statis atau berulang; teks unik (nama, link, TTL) dikirim apa adanya
+            new_strings = len(unique) - len(unique.keys() & self.index.keys())
+            if str not in set(map(type, unique)) or new_strings * 2 > len(values):
+                columns[field] = list(values)
+                continue
+
+            encoded.append(field)
+            positions = {}
+            for value in unique:
+                position = self.index.get(value) if isinstance(value, str) else None
+                if position is None:
+                    position = base + len(strings)
+                    strings.append(value)
+                positions[value] = position
+            columns[field] = list(map(positions.get, values))
+
+        return {
+            'format': 'compact',
+            'dictionary': self.version,
+            'fields': fields,
+            'encoded': encoded,
+            'strings': strings,
+            'columns': columns,
+        }
+
+    def decode(self, payload):
+        """Kebalikan encode(), dipakai untuk verifikasi/benchmark"""
+        table = self.strings + payload['strings']
+        encoded = set(payload['encoded'])
+        count = len(next(iter(payload['columns'].values()), []))
+        records = [{} for _ in range(count)]
+        for field in payload['fields']:
+            for record, value in zip(records, payload['columns'][field]):
+                record[field] = table[value] if field in encoded and value is not None else value
+        return records
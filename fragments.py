@@ -0,0 +1,109 @@
+# fragments.py - Kartu hasil pencarian yang dirender di server
+#
+# Setiap kartu anggota dirender sekali dan disimpan per (periode, anggota,
+# versi data); halaman hasil cukup menyambung fragment yang sudah jadi.
+import json
+
+from markupsafe import escape
+
+from cache import LRUCache
+
+CARD_TEMPLATE = '''
+<div class="col-lg-4 col-md-6 mb-4">
+    <div class="card result-card h-100" data-member='{member_json}' onclick="showDetail(JSON.parse(this.dataset.member))">
+        <div class="card-body">
+            <h6 class="card-title text-primary">
+                <i class="fas fa-user"></i> {nama}
+            </h6>
+            <hr>
+            <p class="card-text">
+                <small class="text-muted">
+                    <i class="fas fa-flag"></i> <strong>Fraksi:</strong> {fraksi}<br>
+                    <i class="fas fa-building"></i> <strong>Partai:</strong> {partai}<br>
+                    <i class="fas fa-map-marker-alt"></i> <strong>Dapil:</strong> {dapil}<br>
+                    <i class="fas fa-birthday-cake"></i> <strong>Kota Lahir:</strong> {kota_lahir}{usia}{agama}
+                </small>
+            </p>
+        </div>
+    </div>
+</div>'''
+
+# Field yang ditampilkan modal detail (showDetail di halaman index)
+DETAIL_FIELDS = (
+    'nama', 'fraksi', 'partai', 'dapil', 'akd_clean', 'ttl', 'agama', 'pendidikan',
+    'pekerjaan', 'organisasi', 'kota_lahir', 'usia', 'pendidikan_terakhir', 'is_kader',
+    'is_dewan', 'usia_kategori', 'rank_partai', 'link_profil', 'link_foto',
+)
+
+
+def _text(member, field, default='N/A'):
+    return escape(member.get(field) or default)
+
+
+def detail_attribute(member):
+    """JSON detail untuk atribut ber-kutip tunggal; hanya &, ' dan < yang
+    di-escape supaya ukurannya tetap mendekati JSON biasa"""
+    detail = json.dumps({field: member.get(field) for field in DETAIL_FIELDS},
+                        ensure_ascii=False, default=str)
+    return detail.replace('&', '&amp;').replace("'", '&#39;').replace('<', '&lt;')
+
+
+def render_member_card(member):
+    """HTML satu kartu hasil, sama dengan kartu yang dibangun JavaScript index"""
+    usia = member.get('usia')
+    agama = member.get('agama')
+    return CARD_TEMPLATE.format(
+        member_json=detail_attribute(member),
+        nama=_text(member, 'nama', 'Nama tidak tersedia'),
+        fraksi=_text(member, 'fraksi'),
+        partai=_text(member, 'partai'),
+        dapil=_text(member, 'dapil'),
+        kota_lahir=_text(member, 'kota_lahir'),
+        usia=f'<br><i class="fas fa-calendar"></i> <strong>Usia:</strong> {escape(usia)} tahun' if usia else '',
+        agama=f'<br><i class="fas fa-pray"></i> <strong>Agama:</strong> {escape(agama)}' if agama else '',
+    )
+
+
+def render_alert(kind, icon, message):
+    return f'<div class="alert alert-{kind}"><i class="fas fa-{icon}"></i> {message}</div>'
+
+
+class FragmentCache:
+    """Cache kartu HTML per (periode, anggota, versi data).
+
+    Versi data ikut di key, jadi setelah database periode diperbarui kartu
+    lama tidak pernah dipakai lagi dan tersingkir sendiri oleh LRU. Versi
+    baris (hash isi record) juga ikut, sehingga kartu yang dirender dari
+    record lama tidak pernah dipakai untuk record hasil perubahan live.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.cache = LRUCache(maxsize)
+
+    def card(self, member, version):
+        # Skor ranking berbeda per query tetapi tidak tampil di kartu
+        row = tuple(item for item in member.items() if item[0] != 'score')
+        key = (member.get('period'), member.get('anggota'), version, hash(row))
+        html = self.cache.get(key)
+        if html is None:
+            html = render_member_card(member)
+            self.cache.put(key, html)
+        return html
+
+    def render_results(self, results, query, versions):
+        """Fragment halaman hasil: ringkasan + kartu-kartu yang disambung"""
+        if not results:
+            return render_alert('info', 'info-circle', 'Tidak ada hasil ditemukan. Coba kata kunci lain.')
+        header = render_alert(
+            'success', 'check-circle',
+            f'Ditemukan <strong>{len(results)}</strong> hasil untuk pencarian: "<strong>{escape(query)}</strong>"'
+        )
+        cards = ''.join(self.card(member, versions[member['period']]) for member in results)
+        return f'{header}<div class="row">{cards}</div>'
+
+    def invalidate(self, period, anggota):
+        """Buang kartu satu anggota setelah datanya berubah"""
+        return self.cache.invalidate(lambda key: key[0] == period and key[1] == anggota)
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,55 @@
+# identity.py - Nama ternormalisasi dan key identitas anggota lintas periode
+#
+# Dipakai saat import (setup_database.py) maupun saat runtime (admin API,
+# ranking), jadi modul ini sengaja tanpa dependensi selain stdlib.
+import hashlib
+import re
+from datetime import datetime
+
+# Gelar di depan nama yang sering berubah antar periode
+NAME_TITLES = {'H', 'HJ', 'HM', 'KH', 'DR', 'DRS', 'DRA', 'IR', 'PROF', 'TGH'}
+
+# Nama bulan di TTL, termasuk ejaan lama
+MONTHS_ID = {
+    'januari': 1, 'februari': 2, 'pebruari': 2, 'maret': 3, 'april': 4,
+    'mei': 5, 'juni': 6, 'juli': 7, 'agustus': 8, 'september': 9,
+    'oktober': 10, 'november': 11, 'nopember': 11, 'desember': 12
+}
+
+
+def normalize_person_name(nama):
+    """Nama tanpa gelar akademik/keagamaan, untuk mencocokkan lintas periode"""
+    nama = str(nama).split(',')[0].upper()
+    tokens = re.sub(r'[^A-Z\s]', ' ', nama.replace('.', ' ')).split()
+    while len(tokens) > 1 and tokens[0] in NAME_TITLES:
+        tokens.pop(0)
+    return ' '.join(tokens)
+
+
+def parse_birth_date(ttl):
+    """Tanggal lahir ISO (YYYY-MM-DD) dari TTL berbahasa Indonesia, atau ''"""
+    if not ttl or '/' not in str(ttl):
+        return ''
+    parts = str(ttl).split('/')[-1].split()
+    if len(parts) != 3:
+        return ''
+    day, month, year = parts
+    month = MONTHS_ID.get(month.lower())
+    try:
+        return datetime(int(year), month, int(day)).strftime('%Y-%m-%d') if month else ''
+    except ValueError:
+        return ''
+
+
+def compute_identity_key(nama, ttl):
+    """Key identitas stabil: hash dari nama ternormalisasi dan tanggal lahir.
+
+    None (NULL) jika nama atau tanggal lahir tidak terbaca: nama saja tidak
+    cukup untuk membedakan orang ("SUGIONO", "RAFLI"), jadi record seperti
+    ini tidak ikut dihubungkan lintas periode.
+    """
+    name, birth_date = normalize_person_name(nama), parse_birth_date(ttl)
+    if not name or not birth_date:
+        return None
+    basis = f"{name}|{birth_date}"
+    return hashlib.sha1(basis.encode('utf-8')).hexdigest()[:16]
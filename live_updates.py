@@ -0,0 +1,237 @@
+# live_updates.py - Perubahan satu anggota langsung ke database periode
+#
+# Database dibuka dalam mode WAL sehingga pembaca tetap dilayani dari
+# snapshot yang konsisten selama penulisan berlangsung. Setiap perubahan
+# dikirim ke subscriber (cache, fragment, analitik) supaya yang dibuang
+# hanya entry yang terpengaruh. Perubahan dari proses lain (worker lain,
+# import ulang) dideteksi lewat PRAGMA data_version, lihat DataVersion.
+import os
+import sqlite3
+import threading
+
+from regions import birth_place
+from related import update_member_related, update_related
+from identity import compute_identity_key
+
+# Kolom yang boleh diisi lewat admin API; kolom turunan dihitung ulang
+EDITABLE_COLUMNS = (
+    'link_foto', 'link_profil', 'nama', 'fraksi', 'dapil', 'akd_clean', 'ttl',
+    'agama', 'pendidikan', 'pekerjaan', 'organisasi', 'kota_lahir', 'usia',
+    'pendidikan_terakhir', 'is_kader', 'is_dewan', 'usia_kategori', 'rank_partai',
+    'partai', 'pendidikan_clean', 'organisasi_clean',
+)
+
+DERIVED_COLUMNS = ('identity_key', 'dapil_provinsi_id', 'lahir_wilayah_id', 'lahir_provinsi_id')
+
+# Kolom yang menjadi fitur anggota terkait (lihat related.extract_features)
+RELATED_COLUMNS = ('anggota', 'dapil', 'akd_clean', 'organisasi')
+
+# Tipe nilai JSON yang bisa disimpan langsung ke kolom SQLite
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+class ChangeError(ValueError):
+    """Perubahan ditolak karena field tidak valid"""
+
+
+class MemberNotFound(ChangeError):
+    """Anggota yang diubah/dihapus tidak ada"""
+
+
+class MemberExists(ChangeError):
+    """Anggota yang ditambahkan sudah ada"""
+
+
+class DataVersion:
+    """Deteksi commit dari koneksi lain ke satu database periode.
+
+    PRAGMA data_version sebuah koneksi hanya berubah jika koneksi LAIN
+    commit (admin API di worker lain, import ulang lewat backup API).
+    MemberWriter menulis lewat koneksi yang sama, sehingga perubahan dari
+    proses ini sendiri (sudah diinvalidasi per anggota) tidak terhitung.
+    """
+
+    def __init__(self, db_path, busy_timeout=5.0):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.lock = threading.Lock()
+        self._conn = None
+        self._seen = None
+
+    def connection(self):
+        """Koneksi bersama (dibuat saat pertama dipakai); pemanggil memegang lock"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._seen = conn.execute('PRAGMA data_version').fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def start(self):
+        """Catat versi sekarang sebagai titik awal (sebelum data dibaca)"""
+        if os.path.exists(self.db_path):
+            with self.lock:
+                self.connection()
+
+    def changed(self):
+        """True jika koneksi lain commit sejak pemanggilan sebelumnya.
+
+        Selama writer memakai koneksi, cek dilewati (False) dan diulang
+        pada pemanggilan berikutnya.
+        """
+        if self._conn is None or not self.lock.acquire(blocking=False):
+            return False
+        try:
+            version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            changed, self._seen = version != self._seen, version
+            return changed
+        except sqlite3.Error:
+            return False
+        finally:
+            self.lock.release()
+
+
+def enable_wal(db_path):
+    """Aktifkan WAL (persisten di file database)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+    finally:
+        conn.close()
+
+
+class MemberWriter:
+    """Insert/update/delete satu anggota di satu database periode.
+
+    Penulisan diserialkan (satu writer per database, lewat koneksi
+    DataVersion) dan dijalankan dalam satu transaksi BEGIN IMMEDIATE
+    bersama pembaruan anggota_related, sehingga pembaca tidak pernah
+    melihat record setengah jadi.
+    """
+
+    def __init__(self, db_path, period, gazetteer, busy_timeout=5.0, data_version=None):
+        self.db_path = db_path
+        self.period = period
+        self.gazetteer = gazetteer
+        self.data_version = data_version or DataVersion(db_path, busy_timeout)
+        self._subscribers = []
+        enable_wal(db_path)
+
+    def subscribe(self, callback):
+        """callback(change) dipanggil setelah commit untuk setiap perubahan"""
+        self._subscribers.append(callback)
+
+    def _fetch(self, conn, anggota):
+        row = conn.execute('SELECT * FROM anggota_dpr WHERE anggota = ?', [anggota]).fetchone()
+        return dict(row) if row else None
+
+    def _derive(self, record):
+        """Hitung ulang identity_key dan key wilayah dari field record"""
+        record['identity_key'] = compute_identity_key(record.get('nama', ''), record.get('ttl', ''))
+        place = birth_place(record.get('kota_lahir'), record.get('ttl'))
+        dapil_ids, wilayah_ids, provinsi_ids, unknown = self.gazetteer.map_members(
+            [record.get('dapil') or ''], [place or '']
+        )
+        record['dapil_provinsi_id'] = dapil_ids[0]
+        record['lahir_wilayah_id'] = wilayah_ids[0]
+        record['lahir_provinsi_id'] = provinsi_ids[0]
+        return {column: list(counts) for column, counts in unknown.items() if counts}
+
+    @staticmethod
+    def _validate(fields):
+        if not isinstance(fields, dict):
+            raise ChangeError("Body harus berupa objek JSON")
+        unknown = sorted(set(fields) - set(EDITABLE_COLUMNS))
+        if unknown:
+            raise ChangeError(f"Field tidak dapat diubah: {', '.join(unknown)}")
+        invalid = sorted(field for field, value in fields.items() if not isinstance(value, SCALAR_TYPES))
+        if invalid:
+            raise ChangeError(f"Nilai field harus teks atau angka: {', '.join(invalid)}")
+
+    def insert(self, anggota, fields):
+        self._validate(fields)
+        if not str(fields.get('nama') or '').strip():
+            raise ChangeError("Field nama wajib diisi")
+        return self._apply('insert', anggota, fields)
+
+    def update(self, anggota, fields):
+        self._validate(fields)
+        if not fields:
+            raise ChangeError("Tidak ada field yang diubah")
+        return self._apply('update', anggota, fields)
+
+    def delete(self, anggota):
+        return self._apply('delete', anggota, {})
+
+    def _apply(self, op, anggota, fields):
+        with self.data_version.lock:
+            conn = self.data_version.connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                change = self._write(conn, op, int(anggota), fields)
+                change['related'] = None
+                # Anggota terkait hanya dihitung ulang jika fiturnya bisa berubah
+                if op != 'update' or set(fields) & set(RELATED_COLUMNS):
+                    change['related'] = self._update_related(conn, change)
+                if conn.in_transaction:
+                    conn.execute('COMMIT')
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+
+        for callback in self._subscribers:
+            try:
+                callback(change)
+            except Exception as e:
+                print(f"⚠️ Notifikasi perubahan gagal ({callback}): {e}")
+        return change
+
+    def _update_related(self, conn, change):
+        """Hitung ulang anggota terkait untuk kelompok fitur anggota ini saja"""
+        summary = update_member_related(conn, change['anggota'], change['after'])
+        if summary is None:
+            records = [dict(row) for row in conn.execute(
+                f"SELECT {', '.join(RELATED_COLUMNS)} FROM anggota_dpr"
+            )]
+            summary = update_related(conn, records)
+        return summary
+
+    def _write(self, conn, op, anggota, fields):
+        before = self._fetch(conn, anggota)
+        unknown_places = {}
+
+        if op == 'insert':
+            if before is not None:
+                raise MemberExists(f"Anggota {anggota} sudah ada")
+            record = {column: '' for column in EDITABLE_COLUMNS}
+            record.update(fields, anggota=anggota)
+            unknown_places = self._derive(record)
+            columns = list(record)
+            conn.execute(
+                f"INSERT INTO anggota_dpr ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [record[column] for column in columns]
+            )
+        elif before is None:
+            raise MemberNotFound(f"Anggota {anggota} tidak ditemukan")
+        elif op == 'update':
+            record = dict(before, **fields)
+            unknown_places = self._derive(record)
+            columns = list(fields) + list(DERIVED_COLUMNS)
+            conn.execute(
+                f"UPDATE anggota_dpr SET {', '.join(f'{column} = ?' for column in columns)} WHERE anggota = ?",
+                [record[column] for column in columns] + [anggota]
+            )
+        else:
+            conn.execute('DELETE FROM anggota_dpr WHERE anggota = ?', [anggota])
+
+        return {
+            'period': self.period,
+            'op': op,
+            'anggota': anggota,
+            'before': before,
+            'after': self._fetch(conn, anggota),
+            'unknown_places': unknown_places,
+        }
@@ -0,0 +1,48 @@
+# periods.py - Konfigurasi periode keanggotaan DPR (satu file SQLite per periode)
+import os
+
+# Urutan dari periode terlama ke terbaru. Periode 2019-2024 tetap memakai
+# nama file lama supaya deployment yang sudah ada tidak perlu diubah.
+PERIODS = {
+    '2014-2019': {
+        'csv': 'dpr_data_2014_2019.csv',
+        'db': 'dpr_data_2014_2019.db',
+    },
+    '2019-2024': {
+        'csv': 'dpr_data_clean.csv',
+        'db': 'dpr_data.db',
+    },
+    '2024-2029': {
+        'csv': 'dpr_data_2024_2029.csv',
+        'db': 'dpr_data_2024_2029.db',
+    },
+}
+
+DEFAULT_PERIOD = os.environ.get('DEFAULT_PERIOD', '2019-2024')
+
+# Nilai parameter period= untuk query lintas periode
+ALL_PERIODS = 'all'
+
+
+def parse_period_param(value, available):
+    """Ubah parameter period= menjadi list periode yang valid.
+
+    Kosong berarti periode default, 'all' berarti semua periode yang
+    tersedia, selain itu daftar periode dipisah koma. Raise ValueError
+    untuk periode yang tidak dikenal.
+    """
+    if value is None or not str(value).strip():
+        return [DEFAULT_PERIOD]
+
+    value = str(value).strip()
+    if value.lower() == ALL_PERIODS:
+        return [period for period in PERIODS if period in available]
+
+    periods = []
+    for period in value.split(','):
+        period = period.strip()
+        if period not in available:
+            raise ValueError(f"Periode tidak tersedia: {period}")
+        if period not in periods:
+            periods.append(period)
+    return periods
@@ -0,0 +1,209 @@
+# profiling.py - Profiling sampling untuk request live (opt-in)
+#
+# Aktif hanya jika PROFILE_SAMPLE_RATE > 0. Jika nonaktif, install() tidak
+# mendaftarkan hook apa pun ke Flask sehingga tidak ada overhead sama sekali.
+import cProfile
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from flask import g, request
+
+# Jangan hitung alokasi milik tracemalloc sendiri
+_TRACEMALLOC_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+
+def short_path(filename):
+    """Dua komponen terakhir path, mis. 'flask/app.py' vs 'package/app.py'"""
+    return '/'.join(filename.replace('\\', '/').split('/')[-2:])
+
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_TRACEMALLOC_FILTERS)
+
+
+class StackSampler:
+    """Thread yang mengambil stack thread-thread request secara periodik.
+
+    Hasilnya berupa hitungan collapsed stack ("a;b;c N") yang bisa
+    langsung diberikan ke flamegraph.pl / speedscope.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self._lock = threading.Lock()
+        self._active = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def watch(self, thread_id, label):
+        with self._lock:
+            self._active[thread_id] = label
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def unwatch(self, thread_id):
+        with self._lock:
+            self._active.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                active = dict(self._active)
+                if not active:
+                    self._wakeup.clear()
+            if not active:
+                self._wakeup.wait()
+                continue
+
+            frames = sys._current_frames()
+            collapsed = []
+            for thread_id, label in active.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    collapsed.append(self._collapse(frame, label))
+            with self._lock:
+                self.stacks.update(collapsed)
+            time.sleep(self.interval)
+
+    def _collapse(self, frame, label):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({short_path(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        names.append(label)
+        return ';'.join(reversed(names))
+
+    def collapsed(self):
+        with self._lock:
+            return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+
+
+class RequestProfiler:
+    """Profil sebagian request dengan cProfile, stack sampling dan tracemalloc.
+
+    tracemalloc hanya berjalan selama ada request yang sedang disampel
+    (dihitung dengan refcount), jadi request lain tidak membayar biaya
+    tracing. Snapshot di akhir request hanya berisi blok yang dialokasikan
+    sejak tracing dimulai; jika beberapa request tersampel tumpang tindih,
+    alokasi request lain di rentang itu ikut terhitung.
+    """
+
+    def __init__(self, sample_rate, trace_allocations=False, stack_interval=0.005):
+        self.sample_rate = sample_rate
+        self.trace_allocations = trace_allocations
+        self.sampler = StackSampler(stack_interval)
+        self._lock = threading.Lock()
+        self._stats = None
+        self._allocations = Counter()
+        self._tracing = 0
+        self.sampled = 0
+        self.started_at = time.time()
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def install(self, app):
+        """Daftarkan hook Flask; tidak melakukan apa pun jika nonaktif"""
+        if not self.enabled:
+            return
+        if self.trace_allocations and tracemalloc.is_tracing():
+            # Tracing milik proses (mis. PYTHONTRACEMALLOC) tidak boleh dihentikan
+            print("⚠️ tracemalloc sudah aktif di luar profiler; profil alokasi dimatikan")
+            self.trace_allocations = False
+        app.before_request(self._before)
+        app.teardown_request(self._teardown)
+        print(f"🔬 Profiling aktif: sample rate {self.sample_rate}, "
+              f"tracemalloc {'on' if self.trace_allocations else 'off'}")
+
+    def _before(self):
+        if request.path.startswith('/debug') or random.random() >= self.sample_rate:
+            return
+        profile = cProfile.Profile()
+        g._profile = {
+            'profile': profile,
+            'thread_id': threading.get_ident(),
+            'traced': self.trace_allocations,
+        }
+        if self.trace_allocations:
+            with self._lock:
+                if self._tracing == 0:
+                    # Satu frame cukup untuk statistik per baris
+                    tracemalloc.start(1)
+                self._tracing += 1
+        self.sampler.watch(g._profile['thread_id'], f"{request.method} {request.url_rule or request.path}")
+        profile.enable()
+
+    def _teardown(self, exc):
+        state = g.pop('_profile', None)
+        if state is None:
+            return
+        state['profile'].disable()
+        self.sampler.unwatch(state['thread_id'])
+
+        allocations = Counter()
+        if state['traced']:
+            snapshot = take_snapshot()
+            with self._lock:
+                self._tracing -= 1
+                if self._tracing == 0:
+                    tracemalloc.stop()
+            for stat in snapshot.statistics('lineno'):
+                frame = stat.traceback[0]
+                allocations[f"{short_path(frame.filename)}:{frame.lineno}"] += stat.size
+
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(state['profile'])
+            else:
+                self._stats.add(state['profile'])
+            self._allocations.update(allocations)
+            self.sampled += 1
+
+    def top_functions(self, limit=25, sort='cumulative'):
+        """Fungsi dengan waktu terbesar, diagregasi dari semua sampel"""
+        with self._lock:
+            if self._stats is None:
+                return []
+            entries = list(self._stats.stats.items())
+
+        index = 3 if sort == 'cumulative' else 2
+        entries.sort(key=lambda item: item[1][index], reverse=True)
+        return [
+            {
+                'function': f"{short_path(filename)}:{line}({name})",
+                'calls': nc,
+                'tottime_ms': round(tt * 1000, 3),
+                'cumtime_ms': round(ct * 1000, 3),
+            }
+            for (filename, line, name), (cc, nc, tt, ct, callers) in entries[:limit]
+        ]
+
+    def top_allocations(self, limit=25):
+        with self._lock:
+            return [
+                {'site': site, 'bytes': size}
+                for site, size in self._allocations.most_common(limit)
+            ]
+
+    def reset(self):
+        with self._lock:
+            self._stats = None
+            self._allocations.clear()
+            self.sampled = 0
+            self.started_at = time.time()
+        self.sampler.reset()
@@ -0,0 +1,134 @@
+# queries.py - SQL yang dipakai app.py, dibagi dengan setup_database.py
+# supaya import bisa memverifikasi query plan dari query yang sama persis
+
+# Pencarian dua tahap: kandidat dipilih dari covering index idx_search yang
+# sempit (tanpa membaca kolom teks panjang seperti organisasi/pendidikan),
+# lalu baris lengkap diambil lewat rowid hanya untuk hasil yang lolos LIMIT.
+# LIKE dengan wildcard di depan tidak bisa memakai index untuk seek, jadi
+# scan atas index sempit adalah rencana terbaik yang bisa didapat.
+SEARCH_SQL = """
+WITH hits AS (
+    SELECT rowid AS rid, nama AS sort_nama,
+        CASE
+            WHEN LOWER(nama) LIKE LOWER(:pattern) THEN 1
+            WHEN LOWER(fraksi) LIKE LOWER(:pattern) THEN 2
+            ELSE 3
+        END AS tier
+    FROM anggota_dpr
+    WHERE LOWER(nama) LIKE LOWER(:pattern)
+       OR LOWER(fraksi) LIKE LOWER(:pattern)
+       OR LOWER(partai) LIKE LOWER(:pattern)
+       OR LOWER(dapil) LIKE LOWER(:pattern)
+    ORDER BY tier, sort_nama
+    LIMIT :limit
+)
+SELECT a.* FROM hits JOIN anggota_dpr a ON a.rowid = hits.rid
+ORDER BY hits.tier, hits.sort_nama
+"""
+
+# Pencarian dalam satu provinsi (dapil atau kota lahir di provinsi itu).
+# Kandidat diambil lewat index key provinsi (MULTI-INDEX OR), bukan LIKE
+# atas teks dapil/kota_lahir; pattern '%' = semua anggota provinsi itu.
+PROVINSI_FILTER = "(dapil_provinsi_id = :provinsi OR lahir_provinsi_id = :provinsi)"
+
+SEARCH_PROVINSI_SQL = f"""
+WITH hits AS (
+    SELECT rowid AS rid, nama AS sort_nama,
+        CASE
+            WHEN LOWER(nama) LIKE LOWER(:pattern) THEN 1
+            WHEN LOWER(fraksi) LIKE LOWER(:pattern) THEN 2
+            ELSE 3
+        END AS tier
+    FROM anggota_dpr
+    WHERE {PROVINSI_FILTER}
+      AND (LOWER(nama) LIKE LOWER(:pattern)
+        OR LOWER(fraksi) LIKE LOWER(:pattern)
+        OR LOWER(partai) LIKE LOWER(:pattern)
+        OR LOWER(dapil) LIKE LOWER(:pattern))
+    ORDER BY tier, sort_nama
+    LIMIT :limit
+)
+SELECT a.* FROM hits JOIN anggota_dpr a ON a.rowid = hits.rid
+ORDER BY hits.tier, hits.sort_nama
+"""
+
+COUNT_SQL = "SELECT COUNT(*) FROM anggota_dpr"
+
+FRAKSI_STATS_SQL = "SELECT fraksi, COUNT(*) FROM anggota_dpr GROUP BY fraksi ORDER BY COUNT(*) DESC LIMIT ?"
+
+PARTAI_STATS_SQL = "SELECT partai, COUNT(*) FROM anggota_dpr GROUP BY partai ORDER BY COUNT(*) DESC LIMIT ?"
+
+COUNT_PROVINSI_SQL = f"SELECT COUNT(*) FROM anggota_dpr WHERE {PROVINSI_FILTER}"
+
+FRAKSI_STATS_PROVINSI_SQL = f"""
+SELECT fraksi, COUNT(*) FROM anggota_dpr WHERE {PROVINSI_FILTER}
+GROUP BY fraksi ORDER BY COUNT(*) DESC LIMIT :top
+"""
+
+PARTAI_STATS_PROVINSI_SQL = f"""
+SELECT partai, COUNT(*) FROM anggota_dpr WHERE {PROVINSI_FILTER}
+GROUP BY partai ORDER BY COUNT(*) DESC LIMIT :top
+"""
+
+# Jumlah anggota per provinsi dapil / provinsi kelahiran
+PROVINSI_DAPIL_STATS_SQL = """
+SELECT p.id, p.nama, COUNT(*) FROM anggota_dpr a
+JOIN provinsi p ON p.id = a.dapil_provinsi_id
+GROUP BY a.dapil_provinsi_id ORDER BY COUNT(*) DESC
+"""
+
+PROVINSI_LAHIR_STATS_SQL = """
+SELECT p.id, p.nama, COUNT(*) FROM anggota_dpr a
+JOIN provinsi p ON p.id = a.lahir_provinsi_id
+GROUP BY a.lahir_provinsi_id ORDER BY COUNT(*) DESC
+"""
+
+IDENTITY_SQL = "SELECT * FROM anggota_dpr WHERE identity_key = ?"
+
+# Baris lengkap untuk hasil top-k RankingIndex; nomor anggota (stabil saat
+# import ulang, tidak seperti rowid/id) dikirim sebagai satu array JSON
+# supaya statement-nya sama untuk berapa pun jumlah hasil
+MEMBERS_BY_ANGGOTA_SQL = "SELECT * FROM anggota_dpr WHERE anggota IN (SELECT value FROM json_each(?))"
+
+RELATED_SQL = """
+SELECT r.rank, r.related AS anggota, r.score, r.shared,
+       a.nama, a.fraksi, a.partai, a.dapil, a.link_foto
+FROM anggota_related r
+JOIN anggota_dpr a ON a.anggota = r.related
+WHERE r.anggota = ?
+ORDER BY r.rank
+LIMIT ?
+"""
+
+# Index dibangun setelah bulk load, dalam satu transaksi
+INDEXES = [
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_anggota ON anggota_dpr(anggota)',
+    'CREATE INDEX IF NOT EXISTS idx_search ON anggota_dpr(nama, fraksi, partai, dapil)',
+    'CREATE INDEX IF NOT EXISTS idx_fraksi ON anggota_dpr(fraksi)',
+    'CREATE INDEX IF NOT EXISTS idx_partai ON anggota_dpr(partai)',
+    'CREATE INDEX IF NOT EXISTS idx_dapil ON anggota_dpr(dapil)',
+    'CREATE INDEX IF NOT EXISTS idx_kota_lahir ON anggota_dpr(kota_lahir)',
+    'CREATE INDEX IF NOT EXISTS idx_agama ON anggota_dpr(agama)',
+    'CREATE INDEX IF NOT EXISTS idx_identity_key ON anggota_dpr(identity_key)',
+    'CREATE INDEX IF NOT EXISTS idx_dapil_provinsi ON anggota_dpr(dapil_provinsi_id)',
+    'CREATE INDEX IF NOT EXISTS idx_lahir_provinsi ON anggota_dpr(lahir_provinsi_id)',
+    'CREATE INDEX IF NOT EXISTS idx_lahir_wilayah ON anggota_dpr(lahir_wilayah_id)',
+]
+
+# Query panas dan parameter contoh untuk EXPLAIN QUERY PLAN. Import gagal
+# jika salah satunya memakai full table scan ("SCAN anggota_dpr" tanpa index).
+HOT_QUERIES = {
+    'search': (SEARCH_SQL, {'pattern': '%aceh%', 'limit': 25}),
+    'search_provinsi': (SEARCH_PROVINSI_SQL, {'provinsi': 11, 'pattern': '%', 'limit': 25}),
+    'count': (COUNT_SQL, []),
+    'count_provinsi': (COUNT_PROVINSI_SQL, {'provinsi': 11}),
+    'stats_fraksi': (FRAKSI_STATS_SQL, [10]),
+    'stats_partai': (PARTAI_STATS_SQL, [10]),
+    'stats_fraksi_provinsi': (FRAKSI_STATS_PROVINSI_SQL, {'provinsi': 11, 'top': 10}),
+    'stats_partai_provinsi': (PARTAI_STATS_PROVINSI_SQL, {'provinsi': 11, 'top': 10}),
+    'stats_provinsi_dapil': (PROVINSI_DAPIL_STATS_SQL, []),
+    'stats_provinsi_lahir': (PROVINSI_LAHIR_STATS_SQL, []),
+    'identity': (IDENTITY_SQL, ['0']),
+    'members_by_anggota': (MEMBERS_BY_ANGGOTA_SQL, ['[1, 2, 3]']),
+    'related': (RELATED_SQL, [1, 10]),
+}
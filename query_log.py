@@ -0,0 +1,162 @@
+# query_log.py - Log query pencarian ke SQLite terpisah, ditulis async per batch
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+
+
+class QueryLog:
+    """Catat query /search tanpa menambah latensi request.
+
+    record() hanya memasukkan tuple ke antrean in-memory; thread latar
+    belakang menulis isinya ke SQLite secara batch. Jika antrean penuh,
+    entry dibuang (dihitung di stats) daripada memblokir request.
+
+    Tabel dibatasi retention_days dan max_rows: thread yang sama membuang
+    entry lama paling sering sekali per prune_interval detik.
+    """
+
+    def __init__(self, db_path='query_log.db', flush_interval=2.0,
+                 batch_size=500, max_pending=10000,
+                 retention_days=30, max_rows=200_000, prune_interval=300):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.retention_days = retention_days
+        self.max_rows = max_rows
+        self.prune_interval = prune_interval
+        self._last_prune = float('-inf')
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stats_lock = threading.Lock()
+        self._stats = {'recorded': 0, 'dropped': 0, 'written': 0, 'write_errors': 0, 'pruned': 0}
+        self._stopped = threading.Event()
+
+        self._init_schema()
+        self._thread = threading.Thread(target=self._run, name='query-log', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS query_log (
+                    id INTEGER PRIMARY KEY,
+                    ts REAL NOT NULL,
+                    query TEXT NOT NULL,
+                    periods TEXT,
+                    result_count INTEGER,
+                    latency_ms REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_query_log_ts ON query_log(ts)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record(self, query, periods, result_count, latency_ms):
+        """Masukkan satu entry ke antrean; tidak pernah memblokir"""
+        entry = (time.time(), query, ','.join(periods), result_count, latency_ms)
+        try:
+            self._queue.put_nowait(entry)
+            key = 'recorded'
+        except queue.Full:
+            key = 'dropped'
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while not self._stopped.is_set() or not self._queue.empty():
+                batch = self._next_batch()
+                if batch:
+                    self._write(conn, batch)
+                if time.monotonic() - self._last_prune >= self.prune_interval:
+                    self.prune(conn)
+        finally:
+            conn.close()
+
+    def _next_batch(self):
+        """Kumpulkan entry sampai batch_size atau flush_interval habis"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (self._stopped.is_set() and self._queue.empty()):
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany(
+                    'INSERT INTO query_log (ts, query, periods, result_count, latency_ms) VALUES (?, ?, ?, ?, ?)',
+                    batch
+                )
+            key, count = 'written', len(batch)
+        except sqlite3.Error as e:
+            print(f"Query log write error: {e}")
+            key, count = 'write_errors', 1
+        with self._stats_lock:
+            self._stats[key] += count
+
+    def prune(self, conn):
+        """Buang entry di luar retention_days dan di atas max_rows terbaru"""
+        self._last_prune = time.monotonic()
+        try:
+            with conn:
+                pruned = conn.execute(
+                    'DELETE FROM query_log WHERE ts < ?', [time.time() - self.retention_days * 86400]
+                ).rowcount
+                pruned += conn.execute(
+                    'DELETE FROM query_log WHERE id <= (SELECT MAX(id) FROM query_log) - ?', [self.max_rows]
+                ).rowcount
+        except sqlite3.Error as e:
+            print(f"Query log prune error: {e}")
+            return 0
+        with self._stats_lock:
+            self._stats['pruned'] += pruned
+        return pruned
+
+    def close(self):
+        """Tulis sisa antrean lalu hentikan thread penulis"""
+        self._stopped.set()
+        self._thread.join(timeout=self.flush_interval + 5)
+
+    def top_queries(self, limit=20, since=None):
+        """Query terpopuler beserta rata-rata jumlah hasil dan latensi"""
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute('''
+                SELECT query, periods, COUNT(*) AS hits,
+                       AVG(result_count) AS avg_results,
+                       AVG(latency_ms) AS avg_latency_ms,
+                       MAX(ts) AS last_seen
+                FROM query_log
+                WHERE ts >= ?
+                GROUP BY query, periods
+                ORDER BY hits DESC
+                LIMIT ?
+            ''', [since or 0, limit]).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        return stats
@@ -0,0 +1,271 @@
+# ranking.py - Ranking pencarian berbobot per field
+#
+# Setiap anggota disimpan sebagai teks dan token ternormalisasi per field
+# (dihitung sekali saat index dibangun). Skor = jumlah bobot field x skor
+# jenis kecocokan (exact, prefix, token, substring); hanya `limit` hasil
+# teratas yang dipilih (partial sort) dan diambil lengkap dari database.
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+from regions import birth_place, is_empty_place
+from identity import normalize_person_name
+
+FIELDS = ('nama', 'partai', 'fraksi', 'dapil', 'kota_lahir')
+
+DEFAULT_WEIGHTS = {'nama': 3.0, 'partai': 2.0, 'fraksi': 1.5, 'dapil': 1.5, 'kota_lahir': 1.0}
+
+# Jenis kecocokan dijumlahkan, jadi "ALI AHMAD" (prefix + token + substring)
+# untuk query "ali" di atas "M. ALI TAHER" (token + substring) di atas
+# "ALIEN MUS" (prefix + substring)
+DEFAULT_MATCH_SCORES = {'exact': 1.0, 'token': 0.6, 'prefix': 0.4, 'substring': 0.2}
+
+# Kolom yang dibaca untuk membangun index; dokumen di-key nomor anggota
+SOURCE_SQL = """
+SELECT anggota, nama, partai, fraksi, dapil, kota_lahir, ttl,
+       dapil_provinsi_id, lahir_provinsi_id
+FROM anggota_dpr
+"""
+
+# Pemisah antar field saat semua field satu record digabung (may_match)
+FIELD_SEPARATOR = '\x1f'
+
+
+def parse_weights(text, defaults):
+    """"nama=5,partai=2" → salinan defaults dengan nilai yang diganti.
+
+    Raise ValueError untuk nama yang tidak dikenal atau nilai bukan angka.
+    """
+    weights = dict(defaults)
+    for item in str(text or '').split(','):
+        if not item.strip():
+            continue
+        name, _, value = item.partition('=')
+        name = name.strip()
+        if name not in weights:
+            raise ValueError(f"Bobot ranking tidak dikenal: {name}")
+        weights[name] = float(value)
+    return weights
+
+
+# Bobot bisa diatur lewat environment, mis. RANKING_WEIGHTS="nama=5,kota_lahir=0"
+FIELD_WEIGHTS = parse_weights(os.environ.get('RANKING_WEIGHTS', ''), DEFAULT_WEIGHTS)
+MATCH_SCORES = parse_weights(os.environ.get('RANKING_MATCH_SCORES', ''), DEFAULT_MATCH_SCORES)
+
+
+def normalize(text):
+    """casefold, tanda baca jadi spasi, spasi dirapikan"""
+    return ' '.join(re.sub(r'[\W_]+', ' ', str(text or '').casefold()).split())
+
+
+def sort_name(nama):
+    """Key urutan nama yang sama untuk semua engine dan periode"""
+    return normalize(normalize_person_name(nama)) or normalize(nama)
+
+
+def field_values(record):
+    """Teks mentah per field FIELDS; kota lahir diambil dari TTL jika kolomnya kosong"""
+    values = {field: record.get(field) for field in FIELDS}
+    place = birth_place(record.get('kota_lahir'), record.get('ttl'))
+    values['kota_lahir'] = '' if is_empty_place(place) else place
+    return values
+
+
+class Document:
+    """Field ternormalisasi satu anggota: per field (teks, nama inti, token)"""
+
+    __slots__ = ('anggota', 'sort_key', 'provinsi', 'fields', 'text')
+
+    def __init__(self, record):
+        self.anggota = int(record['anggota'])
+        self.sort_key = sort_name(record.get('nama'))
+        self.provinsi = (record.get('dapil_provinsi_id'), record.get('lahir_provinsi_id'))
+        fields = []
+        for field, value in field_values(record).items():
+            text = normalize(value)
+            # Nama juga dicocokkan tanpa gelar ("Dra. Hj. X" exact untuk "x")
+            core = self.sort_key if field == 'nama' and self.sort_key != text else None
+            fields.append((field, text, core, frozenset(text.split())))
+        self.fields = tuple(fields)
+        self.text = FIELD_SEPARATOR.join(text for _, text, _, _ in fields)
+
+
+class FieldValues:
+    """Nilai unik satu field (teks, nama inti, token) dan id nilai per anggota.
+
+    Nilai dimensi seperti partai/fraksi/dapil hanya puluhan, jadi skor per
+    query dihitung sekali per nilai unik lalu disebar ke anggota lewat id.
+    """
+
+    def __init__(self, docs, position):
+        self.texts, self.cores, self.tokens = [], [], []
+        lookup = {}
+        ids = []
+        for doc in docs:
+            _, text, core, tokens = doc.fields[position]
+            value_id = lookup.get((text, core))
+            if value_id is None:
+                value_id = lookup[(text, core)] = len(self.texts)
+                self.texts.append(text)
+                self.cores.append(core)
+                self.tokens.append(tokens)
+            ids.append(value_id)
+        self.ids = np.array(ids, dtype=np.int64)
+
+    def contains(self, token):
+        return np.fromiter((token in text for text in self.texts), dtype=bool, count=len(self.texts))
+
+    def scores(self, phrase, tokens, contains, match_scores):
+        """Skor jenis kecocokan untuk setiap nilai unik (0 jika tidak memuat token)"""
+        scores = np.zeros(len(self.texts))
+        matched = np.flatnonzero(np.logical_or.reduce(contains))
+        if not len(matched):
+            return scores
+        texts = [self.texts[i] for i in matched]
+        cores = [self.cores[i] or '' for i in matched]
+        token_sets = [self.tokens[i] for i in matched]
+
+        def flags(values):
+            return np.fromiter(values, dtype=float, count=len(matched))
+
+        exact = flags(text == phrase or core == phrase for text, core in zip(texts, cores))
+        prefix = flags(text.startswith(phrase) or core.startswith(phrase) for text, core in zip(texts, cores))
+        # Token dan substring sebagian untuk query multi kata yang
+        # tersebar di beberapa field (mis. "ali golkar")
+        token_share = sum(flags(token in token_set for token_set in token_sets) for token in tokens) / len(tokens)
+        substring_share = sum(contains[t][matched] for t in range(len(tokens))) / len(tokens)
+
+        scores[matched] = (match_scores['exact'] * exact + match_scores['prefix'] * prefix
+                           + match_scores['token'] * token_share + match_scores['substring'] * substring_share)
+        return scores
+
+
+class RankingIndex:
+    """Index ranking satu database periode.
+
+    Skor anggota = jumlah bobot field x skor nilai field-nya, dihitung
+    vektor dengan NumPy; kandidat = anggota yang memuat setiap token query
+    di salah satu field. Tabel nilai unik dibangun ulang secara malas
+    setelah apply() mengubah anggota.
+    """
+
+    def __init__(self, records, weights=None, match_scores=None):
+        self.weights = dict(weights or FIELD_WEIGHTS)
+        self.match_scores = dict(match_scores or MATCH_SCORES)
+        self._docs = {}
+        for record in records:
+            doc = Document(record)
+            self._docs[doc.anggota] = doc
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    @classmethod
+    def from_sqlite(cls, db_path, **kwargs):
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            return cls([dict(row) for row in conn.execute(SOURCE_SQL)], **kwargs)
+        finally:
+            conn.close()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def apply(self, before, after):
+        """Terapkan perubahan live (record sebelum/sesudah, None jika tidak ada)"""
+        with self._lock:
+            if before is not None:
+                self._docs.pop(int(before['anggota']), None)
+            if after is not None:
+                doc = Document(after)
+                self._docs[doc.anggota] = doc
+            self._snapshot = None
+
+    def _build_snapshot(self):
+        docs = list(self._docs.values())
+        # Peringkat (nama, anggota) sebagai pemutus skor yang sama
+        order = sorted(range(len(docs)), key=lambda i: (docs[i].sort_key, docs[i].anggota))
+        sort_rank = np.empty(len(docs), dtype=np.int64)
+        sort_rank[order] = np.arange(len(docs))
+
+        def provinsi(position):
+            return np.array([doc.provinsi[position] or -1 for doc in docs], dtype=np.int64)
+
+        return {
+            'anggota': np.array([doc.anggota for doc in docs], dtype=np.int64),
+            'sort_rank': sort_rank,
+            'provinsi': (provinsi(0), provinsi(1)),
+            'fields': [FieldValues(docs, position) for position in range(len(FIELDS))],
+        }
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build_snapshot()
+                snapshot = self._snapshot
+        return snapshot
+
+    def match(self, query, provinsi=None, snapshot=None):
+        """(posisi kandidat, skor semua anggota) dalam urutan snapshot"""
+        snapshot = snapshot or self._current()
+        phrase = normalize(query)
+        tokens = phrase.split()
+        count = len(snapshot['anggota'])
+        total = np.zeros(count)
+        mask = np.ones(count, dtype=bool)
+
+        if tokens:
+            found = np.zeros((len(tokens), count), dtype=bool)
+            for field, values in zip(FIELDS, snapshot['fields']):
+                # Field berbobot 0 tidak ikut dicocokkan sama sekali
+                if not self.weights[field]:
+                    continue
+                contains = [values.contains(token) for token in tokens]
+                for t in range(len(tokens)):
+                    found[t] |= contains[t][values.ids]
+                scores = values.scores(phrase, tokens, contains, self.match_scores)
+                total += self.weights[field] * scores[values.ids]
+            mask &= found.all(axis=0)
+        if provinsi is not None:
+            dapil, lahir = snapshot['provinsi']
+            mask &= (dapil == provinsi) | (lahir == provinsi)
+        return np.flatnonzero(mask), np.round(total, 4)
+
+    def candidates(self, query, provinsi=None):
+        """Jumlah anggota yang memenuhi query (untuk benchmark)"""
+        return len(self.match(query, provinsi)[0])
+
+    def top_k(self, query, limit=25, provinsi=None):
+        """[(anggota, skor)] terurut (skor turun, nama, anggota); deterministik.
+
+        Hanya kandidat dengan skor >= skor ke-limit (np.partition) yang
+        diurutkan penuh, jadi biayanya tidak bergantung pada jumlah kandidat.
+        """
+        if not normalize(query) and provinsi is None:
+            return []
+        snapshot = self._current()
+        positions, total = self.match(query, provinsi, snapshot)
+        if not len(positions) or limit <= 0:
+            return []
+        scores = total[positions]
+        if len(positions) > limit:
+            kth = -np.partition(-scores, limit - 1)[limit - 1]
+            keep = scores >= kth
+            positions, scores = positions[keep], scores[keep]
+        order = np.lexsort((snapshot['sort_rank'][positions], -scores))[:limit]
+        return [(int(snapshot['anggota'][positions[i]]), float(scores[i])) for i in order]
+
+
+def may_match(record, needle, weights=None):
+    """Versi longgar dari RankingIndex.candidates untuk invalidasi cache:
+    setiap token query ada di salah satu field record yang bobotnya > 0"""
+    weights = weights or FIELD_WEIGHTS
+    text = FIELD_SEPARATOR.join(
+        normalize(value) for field, value in field_values(record).items() if weights[field]
+    )
+    return all(token in text for token in normalize(needle).split())
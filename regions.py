@@ -0,0 +1,189 @@
+# regions.py - Dimensi wilayah: dapil dan kota lahir → provinsi
+#
+# Dipetakan saat import memakai gazetteer lokal (gazetteer_wilayah.csv) dan
+# disimpan sebagai key integer ber-index, sehingga filter/grup per provinsi
+# tidak perlu LIKE atas teks bebas.
+import csv
+import os
+import re
+from collections import Counter
+
+GAZETTEER_PATH = os.environ.get(
+    'GAZETTEER_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer_wilayah.csv')
+)
+
+# Jenis baris gazetteer yang boleh dipakai untuk memetakan dapil
+PROVINCE_KINDS = {'provinsi', 'alias'}
+
+# Awalan administratif yang dibuang jika nama lengkapnya tidak dikenal
+PLACE_PREFIXES = ('KABUPATEN ', 'KAB ', 'KOTA ADMINISTRASI ', 'KOTA ADM ', 'KOTA ')
+
+# Nilai kota lahir yang memang kosong (bukan tempat yang tidak dikenal)
+EMPTY_PLACES = {'', 'NAN', 'TIDAK TERSEDIA'}
+
+ROMAN_SUFFIX = re.compile(r'\s+[IVXL]+$')
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS provinsi (id INTEGER PRIMARY KEY, nama TEXT NOT NULL)',
+    '''
+    CREATE TABLE IF NOT EXISTS wilayah (
+        id INTEGER PRIMARY KEY,
+        nama TEXT NOT NULL,
+        jenis TEXT NOT NULL,
+        provinsi_id INTEGER NOT NULL
+    )
+    ''',
+]
+
+
+def normalize_place(text):
+    """Huruf besar, tanda baca jadi spasi, spasi dirapikan"""
+    return ' '.join(re.sub(r'[^A-Z0-9]+', ' ', str(text or '').upper()).split())
+
+
+def is_empty_place(text):
+    """Kosong, angka (kolom bergeser, mis. "29.0") atau penanda no_data"""
+    normalized = normalize_place(text)
+    return (normalized in EMPTY_PLACES or normalized.replace(' ', '').isdigit()
+            or 'NO DATA' in normalized)
+
+
+def birth_place(kota_lahir, ttl):
+    """kota_lahir, atau kota dari TTL "Kota / tanggal" jika kolomnya kosong/bergeser"""
+    if is_empty_place(kota_lahir) and '/' in str(ttl or ''):
+        return str(ttl).split('/')[0].strip()
+    return kota_lahir
+
+
+class Gazetteer:
+    """Tabel provinsi dan wilayah (kab/kota, tempat, alias) dari CSV.
+
+    id provinsi = kode wilayah Kemendagri (11 ACEH ... 96 PAPUA BARAT DAYA,
+    99 LUAR NEGERI). id wilayah = nomor baris, jadi file hanya boleh
+    ditambah di bawah supaya id yang sudah tersimpan tetap stabil.
+    """
+
+    def __init__(self, rows):
+        self.provinces = {}
+        self.places = {}
+        self._by_name = {}
+        for wilayah_id, (kode, nama, jenis) in enumerate(rows, 1):
+            provinsi_id = int(kode)
+            key = normalize_place(nama)
+            if jenis == 'provinsi':
+                self.provinces[provinsi_id] = key
+            self.places[wilayah_id] = {'nama': key, 'jenis': jenis, 'provinsi_id': provinsi_id}
+            self._by_name.setdefault(key, wilayah_id)
+
+    @classmethod
+    def load(cls, path=GAZETTEER_PATH):
+        with open(path, encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            return cls([(row['kode_provinsi'], row['nama'], row['jenis']) for row in reader])
+
+    def _lookup(self, name, kinds=None):
+        wilayah_id = self._by_name.get(name)
+        if wilayah_id is None:
+            return None
+        if kinds and self.places[wilayah_id]['jenis'] not in kinds:
+            return None
+        return wilayah_id
+
+    def _candidates(self, text):
+        """Nama utuh, tanpa awalan KOTA/KABUPATEN, tiap bagian "A - B" atau
+        "A, B", lalu kata-kata terakhir (mis. "BUSUNGBIU BULELENG" → "BULELENG")"""
+        normalized = normalize_place(text)
+        yield normalized
+        for prefix in PLACE_PREFIXES:
+            if normalized.startswith(prefix):
+                yield normalized[len(prefix):]
+        parts = [normalize_place(part) for part in re.split(r'[-/,]', str(text))]
+        if len(parts) > 1:
+            yield from reversed([part for part in parts if part])
+        words = normalized.split()
+        for start in range(1, len(words)):
+            yield ' '.join(words[start:])
+
+    def resolve_place(self, text):
+        """(wilayah_id, provinsi_id) untuk teks kota lahir, atau None"""
+        if not normalize_place(text):
+            return None
+        for candidate in self._candidates(text):
+            wilayah_id = self._lookup(candidate)
+            if wilayah_id is not None:
+                return wilayah_id, self.places[wilayah_id]['provinsi_id']
+        return None
+
+    def resolve_province(self, text):
+        """id provinsi dari nama provinsi/alias, dengan atau tanpa nomor dapil
+        ("JAWA BARAT XI", "D.I. YOGYAKARTA"), atau None"""
+        normalized = ROMAN_SUFFIX.sub('', normalize_place(text))
+        wilayah_id = self._lookup(normalized, PROVINCE_KINDS)
+        return self.places[wilayah_id]['provinsi_id'] if wilayah_id is not None else None
+
+    def province_name(self, provinsi_id):
+        return self.provinces.get(provinsi_id)
+
+    def map_members(self, dapils, places):
+        """Kolom key wilayah untuk satu import beserta nilai yang tidak dikenal.
+
+        Return (dapil_provinsi_ids, lahir_wilayah_ids, lahir_provinsi_ids,
+        unknown) dengan unknown = {'dapil': Counter, 'kota_lahir': Counter}.
+        Setiap nilai unik hanya di-resolve sekali.
+        """
+        unknown = {'dapil': Counter(), 'kota_lahir': Counter()}
+
+        dapil_cache = {}
+        dapil_ids = []
+        for dapil in dapils:
+            if dapil not in dapil_cache:
+                dapil_cache[dapil] = self.resolve_province(dapil)
+            provinsi_id = dapil_cache[dapil]
+            if provinsi_id is None and normalize_place(dapil):
+                unknown['dapil'][str(dapil)] += 1
+            dapil_ids.append(provinsi_id)
+
+        place_cache = {}
+        wilayah_ids, provinsi_ids = [], []
+        for place in places:
+            if place not in place_cache:
+                place_cache[place] = None if is_empty_place(place) else self.resolve_place(place)
+            resolved = place_cache[place]
+            if resolved is None and not is_empty_place(place):
+                unknown['kota_lahir'][str(place)] += 1
+            wilayah_ids.append(resolved[0] if resolved else None)
+            provinsi_ids.append(resolved[1] if resolved else None)
+
+        return dapil_ids, wilayah_ids, provinsi_ids, unknown
+
+
+def write_dimension_tables(conn, gazetteer):
+    """Isi ulang tabel provinsi dan wilayah dari gazetteer"""
+    with conn:
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.execute('DELETE FROM provinsi')
+        conn.execute('DELETE FROM wilayah')
+        conn.executemany('INSERT INTO provinsi (id, nama) VALUES (?, ?)', sorted(gazetteer.provinces.items()))
+        conn.executemany(
+            'INSERT INTO wilayah (id, nama, jenis, provinsi_id) VALUES (?, ?, ?, ?)',
+            [(wid, p['nama'], p['jenis'], p['provinsi_id']) for wid, p in gazetteer.places.items()]
+        )
+
+
+def parse_provinsi_param(value, gazetteer):
+    """Ubah parameter provinsi= (kode atau nama/alias) menjadi id provinsi.
+
+    Kosong berarti tanpa filter (None). Raise ValueError untuk provinsi
+    yang tidak dikenal.
+    """
+    if value is None or not str(value).strip():
+        return None
+    value = str(value).strip()
+    if value.isdigit() and int(value) in gazetteer.provinces:
+        return int(value)
+    provinsi_id = gazetteer.resolve_province(value)
+    if provinsi_id is None:
+        raise ValueError(f"Provinsi tidak dikenal: {value}")
+    return provinsi_id
@@ -0,0 +1,238 @@
+# related.py - Daftar anggota terkait (dapil, AKD, organisasi yang sama)
+#
+# Dihitung saat import dan disimpan di tabel anggota_related sehingga
+# endpoint /member/<anggota>/related cukup membaca top-k yang sudah jadi.
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+TOP_K = 20
+
+# Bobot dasar per jenis fitur; dikali 1/log2(1 + jumlah anggota dengan
+# fitur itu) supaya fitur yang dimiliki banyak orang tidak mendominasi.
+# Bobot tidak bergantung pada total anggota, sehingga update inkremental
+# menghasilkan skor yang sama dengan hitung ulang penuh.
+FEATURE_WEIGHTS = {'dapil': 2.0, 'akd': 1.0, 'org': 1.5}
+
+# Fitur yang dimiliki terlalu banyak anggota (mis. "DPP PDI Perjuangan")
+# tidak informatif dan membuat jumlah pasangan meledak
+MAX_FEATURE_MEMBERS = 150
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS anggota_features (
+        anggota INTEGER NOT NULL,
+        feature TEXT NOT NULL,
+        PRIMARY KEY (anggota, feature)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_anggota_features_feature ON anggota_features(feature)',
+    '''
+    CREATE TABLE IF NOT EXISTS anggota_related (
+        anggota INTEGER NOT NULL,
+        rank INTEGER NOT NULL,
+        related INTEGER NOT NULL,
+        score REAL NOT NULL,
+        shared TEXT,
+        PRIMARY KEY (anggota, rank)
+    ) WITHOUT ROWID
+    ''',
+]
+
+
+def _normalize(text):
+    return ' '.join(str(text).split()).casefold()
+
+
+def parse_akd(akd_text):
+    """Daftar AKD dari format "['Komisi V', 'Badan Anggaran']" atau teks biasa"""
+    text = str(akd_text or '')
+    items = re.findall(r"'([^']+)'", text) if '[' in text else text.split(',')
+    return [_normalize(item) for item in items if item.strip()]
+
+
+def parse_organizations(org_text):
+    """Nama organisasi dari "Nama Org,Sebagai: Jabatan. Tahun: ...;..." """
+    orgs = []
+    for entry in str(org_text or '').split(';'):
+        name = re.sub(r'^\s*\d+\.\s*', '', entry.split(',Sebagai')[0])
+        name = _normalize(name)
+        if len(name) >= 4:
+            orgs.append(name)
+    return orgs
+
+
+def extract_features(record):
+    """Set fitur satu anggota, mis. {'dapil:aceh i', 'akd:komisi v', 'org:...'}"""
+    features = set()
+    if record.get('dapil'):
+        features.add(f"dapil:{_normalize(record['dapil'])}")
+    features.update(f"akd:{item}" for item in parse_akd(record.get('akd_clean')))
+    features.update(f"org:{item}" for item in parse_organizations(record.get('organisasi')))
+    return features
+
+
+def features_frame(records):
+    """DataFrame (anggota, feature) dari iterable record"""
+    rows = [
+        (int(record['anggota']), feature)
+        for record in records
+        for feature in extract_features(record)
+    ]
+    return pd.DataFrame(rows, columns=['anggota', 'feature']).drop_duplicates()
+
+
+def _load_features(conn):
+    return pd.read_sql_query('SELECT anggota, feature FROM anggota_features', conn)
+
+
+def _member_sets(frame):
+    return {anggota: frozenset(group) for anggota, group in frame.groupby('anggota')['feature']}
+
+
+def compute_neighbors(features, members, top_k=TOP_K):
+    """Top-k tetangga untuk anggota di members.
+
+    Irisan himpunan fitur dihitung secara vektor: tabel (anggota, fitur)
+    di-join dengan dirinya sendiri pada kolom fitur (sparse join), lalu
+    bobot fitur dijumlahkan per pasangan anggota.
+    """
+    df = features.groupby('feature')['anggota'].transform('size')
+    usable = features[(df > 1) & (df <= MAX_FEATURE_MEMBERS)].copy()
+    if usable.empty:
+        return pd.DataFrame(columns=['anggota', 'rank', 'related', 'score', 'shared'])
+
+    kind = usable['feature'].str.split(':', n=1).str[0]
+    usable['weight'] = kind.map(FEATURE_WEIGHTS).fillna(1.0).to_numpy() / np.log2(1 + df[usable.index].to_numpy())
+
+    left = usable[usable['anggota'].isin(members)]
+    pairs = left.merge(usable[['anggota', 'feature']], on='feature', suffixes=('', '_related'))
+    pairs = pairs[pairs['anggota'] != pairs['anggota_related']]
+    if pairs.empty:
+        return pd.DataFrame(columns=['anggota', 'rank', 'related', 'score', 'shared'])
+
+    scored = pairs.groupby(['anggota', 'anggota_related'], sort=False)['weight'].sum().reset_index(name='score')
+    # Dibulatkan sebelum diurutkan supaya urutan tidak bergantung pada
+    # urutan penjumlahan (hasil inkremental == hitung ulang penuh)
+    scored['score'] = scored['score'].round(4)
+    scored = scored.sort_values(['anggota', 'score', 'anggota_related'], ascending=[True, False, True])
+    top = scored.groupby('anggota', sort=False).head(top_k).copy()
+    top['rank'] = top.groupby('anggota', sort=False).cumcount() + 1
+
+    # Fitur bersama (maks. 5, bobot terbesar dulu) hanya untuk pasangan top-k
+    shared = pairs.merge(top[['anggota', 'anggota_related']], on=['anggota', 'anggota_related'])
+    shared = shared.sort_values(['weight', 'feature'], ascending=[False, True])
+    shared = shared[shared.groupby(['anggota', 'anggota_related']).cumcount() < 5]
+    shared = shared.groupby(['anggota', 'anggota_related'])['feature'].agg(list)
+    top = top.join(shared.rename('shared'), on=['anggota', 'anggota_related'])
+    top['shared'] = [json.dumps(features, ensure_ascii=False) for features in top['shared']]
+
+    top = top.rename(columns={'anggota_related': 'related'})
+    return top[['anggota', 'rank', 'related', 'score', 'shared']]
+
+
+def update_related(conn, records, top_k=TOP_K, full=False):
+    """Perbarui anggota_features dan anggota_related dari records.
+
+    records adalah seluruh anggota saat ini. Hanya anggota yang fiturnya
+    berubah (atau baru/terhapus) beserta anggota yang berbagi fitur dengan
+    mereka yang dihitung ulang, kecuali full=True atau tabel belum ada.
+    Return dict ringkasan {'members', 'changed', 'recomputed'}.
+    """
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+    new = features_frame(records)
+    old = _load_features(conn)
+    new_sets = _member_sets(new)
+    old_sets = _member_sets(old)
+    all_members = {int(record['anggota']) for record in records}
+
+    if full or old.empty:
+        changed = set(all_members) | set(old_sets)
+        affected = set(all_members)
+    else:
+        changed = {
+            anggota for anggota in set(new_sets) | set(old_sets) | all_members
+            if new_sets.get(anggota, frozenset()) != old_sets.get(anggota, frozenset())
+        }
+        touched = set()
+        for anggota in changed:
+            touched |= new_sets.get(anggota, frozenset()) | old_sets.get(anggota, frozenset())
+        affected = (set(new[new['feature'].isin(touched)]['anggota']) | changed) & all_members
+
+    removed = set(old_sets) - all_members
+    neighbors = compute_neighbors(new, affected, top_k) if affected else None
+
+    with conn:
+        stale = list(changed | removed)
+        conn.executemany('DELETE FROM anggota_features WHERE anggota = ?', [(int(a),) for a in stale])
+        changed_rows = new[new['anggota'].isin(changed)]
+        conn.executemany(
+            'INSERT INTO anggota_features (anggota, feature) VALUES (?, ?)',
+            [(int(a), f) for a, f in changed_rows.itertuples(index=False)]
+        )
+
+        conn.executemany('DELETE FROM anggota_related WHERE anggota = ?', [(int(a),) for a in affected | removed])
+        if neighbors is not None and not neighbors.empty:
+            conn.executemany(
+                'INSERT INTO anggota_related (anggota, rank, related, score, shared) VALUES (?, ?, ?, ?, ?)',
+                [(int(a), int(r), int(b), float(s), sh) for a, r, b, s, sh in neighbors.itertuples(index=False)]
+            )
+
+    return {'members': len(all_members), 'changed': len(changed), 'recomputed': len(affected)}
+
+
+def update_member_related(conn, anggota, record, top_k=TOP_K):
+    """Versi update_related untuk satu anggota (record None = dihapus).
+
+    Hanya baris anggota_features dari fitur yang disentuh perubahan (lama
+    dan baru) dan fitur anggota yang terpengaruh yang dibaca, jadi biayanya
+    sebanding dengan kelompok fitur itu, bukan seluruh anggota. Tidak
+    commit; pemanggil menjalankannya di dalam transaksinya sendiri.
+    Return None jika anggota_features masih kosong (pakai update_related).
+    """
+    anggota = int(anggota)
+    if conn.execute('SELECT 1 FROM anggota_features LIMIT 1').fetchone() is None:
+        return None
+
+    old = {row[0] for row in conn.execute('SELECT feature FROM anggota_features WHERE anggota = ?', [anggota])}
+    new = extract_features(record) if record is not None else set()
+    members = conn.execute('SELECT COUNT(*) FROM anggota_dpr').fetchone()[0]
+    if old == new and record is not None:
+        return {'members': members, 'changed': 0, 'recomputed': 0}
+
+    conn.execute('DELETE FROM anggota_features WHERE anggota = ?', [anggota])
+    conn.executemany('INSERT INTO anggota_features (anggota, feature) VALUES (?, ?)',
+                     [(anggota, feature) for feature in sorted(new)])
+
+    # Anggota yang berbagi fitur lama/baru, lalu semua baris fitur mereka
+    # (compute_neighbors butuh jumlah anggota lengkap per fitur)
+    affected = {row[0] for row in conn.execute(
+        'SELECT DISTINCT anggota FROM anggota_features WHERE feature IN (SELECT value FROM json_each(?))',
+        [json.dumps(sorted(old | new), ensure_ascii=False)]
+    )}
+    if record is not None:
+        affected.add(anggota)
+
+    neighbors = None
+    if affected:
+        features = pd.read_sql_query(
+            """
+            SELECT anggota, feature FROM anggota_features
+            WHERE feature IN (
+                SELECT feature FROM anggota_features WHERE anggota IN (SELECT value FROM json_each(?))
+            )
+            """, conn, params=[json.dumps(sorted(affected))]
+        )
+        neighbors = compute_neighbors(features, affected, top_k)
+
+    conn.executemany('DELETE FROM anggota_related WHERE anggota = ?', [(a,) for a in affected | {anggota}])
+    if neighbors is not None and not neighbors.empty:
+        conn.executemany(
+            'INSERT INTO anggota_related (anggota, rank, related, score, shared) VALUES (?, ?, ?, ?, ?)',
+            [(int(a), int(r), int(b), float(s), sh) for a, r, b, s, sh in neighbors.itertuples(index=False)]
+        )
+    return {'members': members, 'changed': 1, 'recomputed': len(affected)}
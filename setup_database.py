@@ -3,55 +3,180 @@ import sqlite3
 import pandas as pd
 import os
 import re
+import sys
+import json
+import time
+import argparse
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 
-def create_database():
-    """Buat database dan tabel SQLite"""
-    conn = sqlite3.connect('dpr_data.db')
-    cursor = conn.cursor()
+from identity import compute_identity_key
+from periods import PERIODS
+from queries import INDEXES, HOT_QUERIES
+from regions import Gazetteer, birth_place, write_dimension_tables
+from related import update_related
+
+class ImportTimer:
+    """Catat waktu, throughput dan memori puncak untuk setiap tahap import.
+
+    tracemalloc memperlambat tahap yang banyak alokasi beberapa kali lipat,
+    jadi memori puncak hanya diukur jika trace_memory=True (--memory); waktu
+    dari run seperti itu tidak mewakili import biasa.
+    """
+    
+    def __init__(self, label, profile_dir=None, trace_memory=False):
+        self.label = label
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.notes = {}
+        self.started = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+    
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Context manager satu tahap; jumlah baris bisa diisi lewat info['rows']"""
+        info = {'rows': rows}
+        profile = cProfile.Profile() if self.profile_dir else None
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        if profile:
+            profile.enable()
+        try:
+            yield info
+        finally:
+            if profile:
+                profile.disable()
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+            rows = info['rows']
+            self.stages.append({
+                'stage': name,
+                'seconds': round(seconds, 4),
+                'rows': rows,
+                'rows_per_sec': round(rows / seconds, 1) if rows and seconds > 0 else None,
+                'peak_mb': round(peak / 1024 / 1024, 2) if peak is not None else None
+            })
+            if profile:
+                self._dump_profile(name, profile)
+    
+    def _dump_profile(self, name, profile):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{self.label}_{name}.prof")
+        profile.dump_stats(path)
+        print(f"\n🔬 Profil tahap {name} → {path}")
+        pstats.Stats(profile, stream=sys.stdout).sort_stats('cumulative').print_stats(8)
     
-    # Buat tabel sesuai struktur data asli
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS anggota_dpr (
-            id INTEGER PRIMARY KEY,
-            anggota INTEGER UNIQUE,
-            link_foto TEXT,
-            link_profil TEXT,
-            nama TEXT NOT NULL,
-            fraksi TEXT,
-            dapil TEXT,
-            akd_clean TEXT,
-            ttl TEXT,
-            agama TEXT,
-            pendidikan TEXT,
-            pekerjaan TEXT,
-            organisasi TEXT,
-            kota_lahir TEXT,
-            usia INTEGER,
-            pendidikan_terakhir TEXT,
-            is_kader TEXT,
-            is_dewan TEXT,
-            usia_kategori TEXT,
-            rank_partai INTEGER,
-            partai TEXT,
-            pendidikan_clean TEXT,
-            organisasi_clean TEXT
-        )
-    ''')
+    def report(self, **extra):
+        report = {
+            'label': self.label,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'total_seconds': round(time.perf_counter() - self.started, 4),
+            'trace_memory': self.trace_memory,
+            'stages': self.stages
+        }
+        report.update(self.notes)
+        report.update(extra)
+        return report
+    
+    def print_summary(self):
+        print(f"\n⏱️  Ringkasan import {self.label}")
+        print(f"{'Tahap':<28}{'Detik':>10}{'Baris':>10}{'Baris/detik':>14}{'Peak MB':>10}")
+        print("-" * 72)
+        for stage in self.stages:
+            rows = stage['rows'] if stage['rows'] is not None else '-'
+            rate = stage['rows_per_sec'] if stage['rows_per_sec'] is not None else '-'
+            peak = stage['peak_mb'] if stage['peak_mb'] is not None else '-'
+            print(f"{stage['stage']:<28}{stage['seconds']:>10.4f}{rows:>10}{rate:>14}{peak:>10}")
+        print("-" * 72)
+        print(f"{'Total':<28}{time.perf_counter() - self.started:>10.4f}")
+    
+    def append_json(self, path, **extra):
+        """Tambahkan laporan sebagai satu baris JSON supaya bisa dilacak dari waktu ke waktu"""
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.report(**extra), ensure_ascii=False) + '\n')
+        print(f"📝 Laporan import ditulis ke {path}")
+
+def timed_stage(timer, name, rows=None):
+    """timer.stage() jika timer ada, selain itu context kosong"""
+    if timer is None:
+        return nullcontext({'rows': rows})
+    return timer.stage(name, rows)
+
+# Schema tanpa index maupun constraint UNIQUE: semua index dibangun
+# sekaligus setelah bulk load (lihat build_indexes)
+SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS anggota_dpr (
+        id INTEGER PRIMARY KEY,
+        anggota INTEGER,
+        link_foto TEXT,
+        link_profil TEXT,
+        nama TEXT NOT NULL,
+        fraksi TEXT,
+        dapil TEXT,
+        akd_clean TEXT,
+        ttl TEXT,
+        agama TEXT,
+        pendidikan TEXT,
+        pekerjaan TEXT,
+        organisasi TEXT,
+        kota_lahir TEXT,
+        usia INTEGER,
+        pendidikan_terakhir TEXT,
+        is_kader TEXT,
+        is_dewan TEXT,
+        usia_kategori TEXT,
+        rank_partai INTEGER,
+        partai TEXT,
+        pendidikan_clean TEXT,
+        organisasi_clean TEXT,
+        identity_key TEXT,
+        dapil_provinsi_id INTEGER,
+        lahir_wilayah_id INTEGER,
+        lahir_provinsi_id INTEGER
+    )
+'''
+
+class QueryPlanError(Exception):
+    """Query panas tidak memakai index setelah import"""
+
+def create_database(conn):
+    """Buat ulang tabel anggota_dpr (kosong, tanpa index) di database kerja"""
+    with conn:
+        conn.execute('DROP TABLE IF EXISTS anggota_dpr')
+        # Buat tabel sesuai struktur data asli
+        conn.execute(SCHEMA_SQL)
+
+def build_indexes(conn):
+    """Bangun semua index dalam satu transaksi setelah data dimuat"""
+    with conn:
+        for statement in INDEXES:
+            conn.execute(statement)
+
+def check_query_plans(conn):
+    """EXPLAIN QUERY PLAN untuk query panas; raise jika ada full table scan"""
+    plans = {}
+    regressions = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        plans[name] = details
+        # "SCAN anggota_dpr" atau "SCAN a" tanpa "USING ... INDEX" = full scan
+        if any(re.fullmatch(r'SCAN (anggota_dpr|a)( AS \w+)?', detail) for detail in details):
+            regressions.append(name)
     
-    # Buat index untuk pencarian cepat
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_nama ON anggota_dpr(nama)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_fraksi ON anggota_dpr(fraksi)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_partai ON anggota_dpr(partai)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_dapil ON anggota_dpr(dapil)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_kota_lahir ON anggota_dpr(kota_lahir)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_agama ON anggota_dpr(agama)')
+    for name, details in plans.items():
+        print(f"   {'❌' if name in regressions else '✅'} {name}: {' | '.join(details)}")
     
-    conn.commit()
-    conn.close()
-    print("Database dan tabel berhasil dibuat!")
+    if regressions:
+        raise QueryPlanError(f"Query panas memakai full table scan: {', '.join(regressions)}")
+    return plans
 
-def clean_data(df):
+def clean_data(df, timer=None):
     """Bersihkan data seperti di kode asli"""
     
     def extract_education(edu_text):
@@ -120,100 +245,228 @@ def clean_data(df):
         
         return None
     
-    # Bersihkan nama kolom
-    df.columns = [str(col).strip() for col in df.columns]
-    
-    # Hapus kolom unnamed
-    unnamed_cols = [col for col in df.columns if 'Unnamed' in str(col)]
-    if unnamed_cols:
-        df = df.drop(columns=unnamed_cols)
-    
-    # Fill NaN dengan string kosong
-    df = df.fillna('')
+    with timed_stage(timer, 'clean_columns', len(df)):
+        # Bersihkan nama kolom
+        df.columns = [str(col).strip() for col in df.columns]
+        
+        # Hapus kolom unnamed
+        unnamed_cols = [col for col in df.columns if 'Unnamed' in str(col)]
+        if unnamed_cols:
+            df = df.drop(columns=unnamed_cols)
+        
+        # Fill NaN dengan string kosong
+        df = df.fillna('')
     
     # Bersihkan nama
     if 'nama' in df.columns:
-        df['nama'] = df['nama'].astype(str).str.replace('"', '').str.strip()
+        with timed_stage(timer, 'clean_nama', len(df)):
+            df['nama'] = df['nama'].astype(str).str.replace('"', '').str.strip()
     
     # Proses data pendidikan
     if 'pendidikan' in df.columns:
-        df['pendidikan_clean'] = df['pendidikan'].apply(extract_education)
+        with timed_stage(timer, 'extract_education', len(df)):
+            df['pendidikan_clean'] = df['pendidikan'].apply(extract_education)
     
     # Proses data organisasi
     if 'organisasi' in df.columns:
-        df['organisasi_clean'] = df['organisasi'].apply(extract_organizations)
+        with timed_stage(timer, 'extract_organizations', len(df)):
+            df['organisasi_clean'] = df['organisasi'].apply(extract_organizations)
     
     # Extract kota lahir dari TTL
     if 'ttl' in df.columns:
         if 'kotaLahir' not in df.columns:
-            df['kota_lahir'] = df['ttl'].apply(extract_birth_city)
+            with timed_stage(timer, 'extract_birth_city', len(df)):
+                df['kota_lahir'] = df['ttl'].apply(extract_birth_city)
         else:
             # Jika sudah ada kotaLahir, rename saja
             df = df.rename(columns={'kotaLahir': 'kota_lahir'})
     
     # Hitung usia
     if 'usia' not in df.columns and 'ttl' in df.columns:
-        df['usia'] = df['ttl'].apply(calculate_age)
+        with timed_stage(timer, 'calculate_age', len(df)):
+            df['usia'] = df['ttl'].apply(calculate_age)
     
     # Bersihkan kolom numerik
     if 'Anggota' in df.columns:
-        df['anggota'] = pd.to_numeric(df['Anggota'], errors='coerce')
-        df = df.dropna(subset=['anggota'])
+        with timed_stage(timer, 'anggota_numeric', len(df)):
+            df['anggota'] = pd.to_numeric(df['Anggota'], errors='coerce')
+            df = df.dropna(subset=['anggota'])
+    
+    # Key identitas untuk menghubungkan anggota yang menjabat beberapa periode
+    if 'nama' in df.columns:
+        with timed_stage(timer, 'identity_key', len(df)):
+            ttl = df['ttl'] if 'ttl' in df.columns else pd.Series('', index=df.index)
+            df['identity_key'] = [compute_identity_key(n, t) for n, t in zip(df['nama'], ttl)]
     
     return df
 
-def import_from_csv(csv_file):
-    """Import data dari CSV ke SQLite dengan pembersihan"""
+def assign_regions(df, gazetteer):
+    """Tambahkan key provinsi dapil serta wilayah/provinsi kota lahir.
+
+    Return (df, unknown) dengan unknown berisi nilai dapil/kota_lahir yang
+    tidak ada di gazetteer beserta jumlahnya, untuk dilaporkan.
+    """
+    # kota_lahir kosong/bergeser (mis. "60") diambil dari TTL "Kota / tanggal"
+    ttl = df['ttl'] if 'ttl' in df.columns else pd.Series('', index=df.index)
+    places = [birth_place(k, t) for k, t in zip(df['kota_lahir'], ttl)]
+    dapil_ids, wilayah_ids, provinsi_ids, unknown = gazetteer.map_members(df['dapil'].tolist(), places)
+    df['dapil_provinsi_id'] = pd.array(dapil_ids, dtype='Int64')
+    df['lahir_wilayah_id'] = pd.array(wilayah_ids, dtype='Int64')
+    df['lahir_provinsi_id'] = pd.array(provinsi_ids, dtype='Int64')
+    return df, unknown
+
+def report_unknown_places(unknown, limit=15):
+    """Cetak tempat yang tidak dikenal; return ringkasan untuk laporan JSON"""
+    summary = {}
+    for column, counts in unknown.items():
+        summary[column] = dict(counts.most_common())
+        if counts:
+            print(f"⚠️  {len(counts)} nilai {column} tidak dikenal ({sum(counts.values())} baris), "
+                  f"tambahkan ke gazetteer_wilayah.csv jika valid:")
+            print("   " + ", ".join(f"{value} ({count})" for value, count in counts.most_common(limit)))
+    return summary
+
+def open_staging(db_path, staging_path):
+    """Database kerja untuk import: salinan database lama (supaya anggota
+    terkait tetap dihitung inkremental) atau database kosong"""
+    remove_database_files(staging_path)
+    conn = sqlite3.connect(staging_path)
+    if os.path.exists(db_path):
+        source = sqlite3.connect(db_path)
+        try:
+            source.backup(conn)
+        finally:
+            source.close()
+        conn.execute('PRAGMA journal_mode=DELETE')
+    return conn
+
+def publish_database(conn, db_path):
+    """Salin database kerja ke db_path lewat backup API SQLite.
+
+    Penyalinan berjalan sebagai satu transaksi tulis di database tujuan,
+    jadi aman untuk database WAL yang sedang dibaca app: pembaca melihat
+    data lama atau data baru, tidak pernah campuran.
+    """
+    target = sqlite3.connect(db_path, timeout=30)
+    try:
+        conn.backup(target)
+        # WAL: pembaca tetap dilayani saat admin API menulis perubahan live
+        target.execute('PRAGMA journal_mode=WAL')
+        # Checkpoint supaya file utama (dan mtime-nya) ikut diperbarui
+        target.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    finally:
+        target.close()
+
+def remove_database_files(path):
+    for suffix in ('', '-journal', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def import_from_csv(csv_file, db_path='dpr_data.db', timer=None):
+    """Import data dari CSV ke SQLite dengan pembersihan.
+
+    Semua tahap berjalan di database kerja (db_path + '.import') yang baru
+    disalin ke db_path setelah query plan lolos. QueryPlanError diteruskan
+    ke pemanggil tanpa mengubah db_path; error lain dicetak dan return False.
+    """
     if not os.path.exists(csv_file):
         print(f"File {csv_file} tidak ditemukan!")
         return False
     
+    staging_path = f"{db_path}.import"
+    conn = None
     try:
         # Baca CSV
         print(f"Membaca {csv_file}...")
-        df = pd.read_csv(csv_file, encoding='utf-8', low_memory=False)
+        with timed_stage(timer, 'read_csv') as stage:
+            df = pd.read_csv(csv_file, encoding='utf-8', low_memory=False)
+            stage['rows'] = len(df)
         print(f"Data asli: {df.shape[0]} baris, {df.shape[1]} kolom")
         
         # Bersihkan data
-        df = clean_data(df)
+        df = clean_data(df, timer)
         print(f"Data setelah dibersihkan: {df.shape[0]} baris")
         
-        # Koneksi ke database
-        conn = sqlite3.connect('dpr_data.db')
+        # Koneksi ke database kerja
+        with timed_stage(timer, 'staging_copy'):
+            conn = open_staging(db_path, staging_path)
         
         # Pastikan kolom sesuai dengan schema database
         required_columns = [
             'anggota', 'link_foto', 'link_profil', 'nama', 'fraksi', 'dapil',
             'akd_clean', 'ttl', 'agama', 'pendidikan', 'pekerjaan', 'organisasi',
             'kota_lahir', 'usia', 'pendidikan_terakhir', 'is_kader', 'is_dewan',
-            'usia_kategori', 'rank_partai', 'partai', 'pendidikan_clean', 'organisasi_clean'
+            'usia_kategori', 'rank_partai', 'partai', 'pendidikan_clean', 'organisasi_clean',
+            'identity_key', 'dapil_provinsi_id', 'lahir_wilayah_id', 'lahir_provinsi_id'
         ]
         
-        # Tambahkan kolom yang hilang dengan nilai default
-        for col in required_columns:
-            if col not in df.columns:
-                df[col] = ''
+        # Dimensi wilayah dari gazetteer lokal
+        with timed_stage(timer, 'region_mapping', len(df)):
+            for col in ('dapil', 'kota_lahir'):
+                if col not in df.columns:
+                    df[col] = ''
+            gazetteer = Gazetteer.load()
+            df, unknown = assign_regions(df, gazetteer)
+            write_dimension_tables(conn, gazetteer)
+        unknown_places = report_unknown_places(unknown)
+        if timer is not None:
+            timer.notes['unknown_places'] = unknown_places
         
-        # Pilih hanya kolom yang dibutuhkan
-        df = df[required_columns]
+        with timed_stage(timer, 'schema_alignment', len(df)):
+            # Tambahkan kolom yang hilang dengan nilai default
+            for col in required_columns:
+                if col not in df.columns:
+                    df[col] = ''
+            
+            # Pilih hanya kolom yang dibutuhkan
+            df = df[required_columns]
         
-        # Insert ke database
-        df.to_sql('anggota_dpr', conn, if_exists='replace', index=False)
+        # Bulk load ke tabel baru tanpa index; to_sql(if_exists='replace')
+        # akan membuang schema beserta index-nya, jadi tabel dibuat ulang di sini
+        with timed_stage(timer, 'insert', len(df)):
+            create_database(conn)
+            df.to_sql('anggota_dpr', conn, if_exists='append', index=False)
+            conn.commit()
         
-        conn.close()
+        with timed_stage(timer, 'index_build', len(df)):
+            build_indexes(conn)
+        
+        # Daftar anggota terkait; hanya anggota yang berubah yang dihitung ulang
+        with timed_stage(timer, 'related_members', len(df)):
+            related = update_related(conn, df.to_dict('records'))
+        print(f"Anggota terkait: {related['changed']} berubah, {related['recomputed']} dihitung ulang")
+        
+        with timed_stage(timer, 'analyze', len(df)):
+            conn.execute('ANALYZE')
+            conn.execute('PRAGMA optimize')
+            conn.commit()
         
-        print(f"✅ Data berhasil diimport ke database SQLite!")
+        # Query plan diperiksa sebelum data dipublikasikan ke db_path
+        print("Memeriksa query plan:")
+        with timed_stage(timer, 'query_plan_check'):
+            check_query_plans(conn)
+        
+        with timed_stage(timer, 'publish', len(df)):
+            publish_database(conn, db_path)
+        
+        print(f"✅ Data berhasil diimport ke database SQLite {db_path}!")
         print(f"   Total records: {len(df)}")
         return True
         
+    except QueryPlanError:
+        raise
     except Exception as e:
         print(f"❌ Error saat import: {e}")
         return False
+    finally:
+        if conn is not None:
+            conn.close()
+        remove_database_files(staging_path)
 
-def verify_database():
+def verify_database(db_path='dpr_data.db'):
     """Verifikasi database dan tampilkan statistik"""
     try:
-        conn = sqlite3.connect('dpr_data.db')
+        conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
         # Hitung total records
@@ -231,7 +484,7 @@ def verify_database():
         conn.close()
         
         print("\n" + "="*50)
-        print("VERIFIKASI DATABASE")
+        print(f"VERIFIKASI DATABASE {db_path}")
         print("="*50)
         print(f"Total anggota DPR: {total}")
         print("\nSample data:")
@@ -248,28 +501,54 @@ def verify_database():
         print(f"Error verifikasi: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Setup database SQLite untuk Portal DPR')
+    parser.add_argument('--report', default='import_report.jsonl',
+                        help='File JSON Lines tempat laporan waktu import ditambahkan')
+    parser.add_argument('--profile', action='store_true',
+                        help='Simpan profil cProfile per tahap di import_profiles/')
+    parser.add_argument('--memory', action='store_true',
+                        help='Ukur memori puncak per tahap dengan tracemalloc (memperlambat import)')
+    args = parser.parse_args()
+    
     print("🚀 Setup Database SQLite untuk Portal DPR")
     print("-" * 40)
     
-    # 1. Buat database dan tabel
-    create_database()
-    
-    # 2. Import data dari CSV
-    csv_files = ['dpr_data_clean.csv']
-    
-    imported = False
-    for csv_file in csv_files:
-        if os.path.exists(csv_file):
-            print(f"\nMenggunakan file: {csv_file}")
-            if import_from_csv(csv_file):
-                imported = True
-                break
+    # Satu database per periode; periode tanpa CSV dilewati
+    imported = []
+    failed = []
+    for period, config in PERIODS.items():
+        csv_file = config['csv']
+        if not os.path.exists(csv_file):
+            print(f"File {csv_file} untuk periode {period} tidak ditemukan")
+            continue
+        
+        print(f"\n📅 Periode {period}: menggunakan file {csv_file}")
+        
+        timer = ImportTimer(period, profile_dir='import_profiles' if args.profile else None,
+                            trace_memory=args.memory)
+        
+        # 1. Import data dari CSV (tabel dibuat ulang oleh import)
+        try:
+            success = import_from_csv(csv_file, config['db'], timer)
+        except QueryPlanError as e:
+            print(f"❌ Import periode {period} dibatalkan, database tidak diubah: {e}")
+            success = False
+        
+        if success:
+            imported.append(period)
+            timer.print_summary()
+            timer.append_json(args.report, period=period, csv=csv_file, db=config['db'])
         else:
-            print(f"File {csv_file} tidak ditemukan")
+            failed.append(period)
+    
+    # 2. Verifikasi hasil
+    for period in imported:
+        verify_database(PERIODS[period]['db'])
     
-    if not imported:
+    if not imported and not failed:
         print("❌ Tidak ada file CSV yang berhasil diimport!")
         print("Pastikan file CSV ada di direktori yang sama dengan script ini.")
-    else:
-        # 3. Verifikasi hasil
-        verify_database()
\ No newline at end of file
+        sys.exit(1)
+    if failed:
+        print(f"❌ Import gagal untuk periode: {', '.join(failed)}")
+        sys.exit(1)
@@ -0,0 +1,78 @@
+# singleflight.py - Penggabungan request identik yang berjalan bersamaan
+import threading
+
+
+class SingleFlightTimeout(Exception):
+    """Menunggu hasil komputasi bersama melebihi batas waktu"""
+
+
+class _Call:
+    """Satu komputasi yang sedang berjalan untuk sebuah key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Pastikan hanya satu komputasi per key yang berjalan pada satu waktu.
+
+    Thread pertama untuk sebuah key (leader) menjalankan fungsi, thread lain
+    dengan key yang sama menunggu dan menerima hasil (atau exception) yang
+    sama. Hasil dibagi ke semua pemanggil, jadi jangan dimodifikasi.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {
+            'leaders': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'timeouts': 0,
+        }
+
+    def do(self, key, fn, timeout=None):
+        """Jalankan fn() untuk key, atau tunggu hasil leader yang sedang berjalan"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self._stats['leaders'] += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+                leader = False
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                with self._lock:
+                    self._stats['errors'] += 1
+            finally:
+                # Lepas key sebelum membangunkan follower supaya request
+                # berikutnya memulai komputasi baru, bukan membaca hasil lama
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+        elif not call.done.wait(timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise SingleFlightTimeout(f"Timeout menunggu hasil untuk key {key!r}")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        """Snapshot metrik penggabungan"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats